@@ -33,21 +33,60 @@
 
 """ Manage the linguistic analyzis """
 
+import bisect
+import collections
+import errno
+import fcntl
 import gobject
+import hashlib
 import json
 import os
-import Queue
+import socket
 import subprocess
 import tempfile
+import time
+import weakref
 
 from g_config import GrammalecteConfig
 
+from g_cache import GResultCache, GDiskCache
+from g_paragraph import split_paragraphs, compose_paragraphs, dispatch_result
+from g_paragraph import shift_result, is_empty_result, sort_paragraphs
+from g_paragraph import split_shards, update_paragraphs
+from g_scheduler import GRequestQueue
+
+_PIPE_CHUNK_SIZE = 65536
+_PROGRESS_DELAY = 0.25
+_WORKER_SCRIPT = os.path.join(
+	os.path.dirname(os.path.abspath(__file__)), "g_worker.py")
+_DAEMON_CONNECT_ATTEMPTS = 250
+_DAEMON_CONNECT_DELAY = 0.02
+
+def _set_non_blocking(pipe):
+	"""
+		Set the pipe in non blocking mode.
+
+		:param pipe: the pipe.
+		:type pipe: file
+	"""
+	flags = fcntl.fcntl(pipe.fileno(), fcntl.F_GETFL)
+	fcntl.fcntl(pipe.fileno(), fcntl.F_SETFL, flags | os.O_NONBLOCK)
+
 class GrammalecteRequester:
 	"""
 		An object which can request an analyzis.
 
-		Any object calling the analyzer must override all these methods.
+		Any object calling the analyzer must override the get_config, get_text
+		and get_generation methods. The other methods give hints to schedule
+		the analyzis, and may be overridden.
+
+		The generation of the requester must change each time a new analyzis
+		is needed, so that the results of the previous analyzis, if still in
+		progress, are dropped.
 	"""
+	PRIORITY_ACTIVE = 0
+	PRIORITY_VISIBLE = 1
+	PRIORITY_BACKGROUND = 2
 
 	def get_config(self):
 		"""
@@ -67,38 +106,89 @@ class GrammalecteRequester:
 		"""
 		pass
 
+	def get_generation(self):
+		"""
+			Get the generation of the requester content.
+
+			:return: the generation.
+			:rtype: int
+		"""
+		pass
+
+	def get_dirty_lines(self):
+		"""
+			Get the lines changed since the text was last read.
+
+			This method is called just before reading the text. When the
+			changed lines are known, only them and the paragraphs around them
+			are split again.
+
+			:return: the ranges of changed lines, as given by GDirtyLines, or
+				None if unknown.
+			:rtype: list
+		"""
+		return None
+
+	def get_priority(self):
+		"""
+			Get the priority of the requester.
+
+			Requesters with the lowest priority value are analyzed first.
+
+			:return: the priority, one of the PRIORITY_* values.
+			:rtype: int
+		"""
+		return GrammalecteRequester.PRIORITY_BACKGROUND
+
+	def get_cursor_line(self):
+		"""
+			Get the line where the user is working.
+
+			:return: the line number (starting at 0), or None if unknown.
+			:rtype: int
+		"""
+		return None
+
+	def get_visible_lines(self):
+		"""
+			Get the lines currently seen by the user.
+
+			:return: the first and last visible lines (starting at 0), or None
+				if unknown.
+			:rtype: tuple
+		"""
+		return None
+
+	def get_client(self):
+		"""
+			Get the client the requester belongs to.
+
+			Clients of a same priority are served in turn.
+
+			:return: the client (e.g. the window), or None if unknown.
+			:rtype: object
+		"""
+		return None
+
 class _TempFile():
-	""" A temporary file """
+	"""
+		A temporary file.
+
+		Grammalecte command line interface only reads regular files, so the
+		text to analyze is given to it through such a file.
+	"""
 
 	def __init__(self):
 		""" Create the file """
 		self.__descriptor, self.__path = tempfile.mkstemp()
 		self.close()
 
-	def read(self):
-		""" Read the file and return text """
-		self.open_read()
-		result = self.__descriptor.read()
-		self.close()
-		return result
-
 	def write(self, text):
 		""" Write the content of text to the file """
-		self.open_write()
-		self.__descriptor.write(text)
-		self.close()
-
-	def open_read(self):
-		""" Open file for reading """
-		self.close()
-		self.__descriptor = open(self.__path, 'r')
-		return self.__descriptor
-
-	def open_write(self):
-		""" Open file for writing """
 		self.close()
 		self.__descriptor = open(self.__path, 'w')
-		return self.__descriptor
+		self.__descriptor.write(text)
+		self.close()
 
 	def get_path(self):
 		""" Get the path to the file """
@@ -116,13 +206,491 @@ class _TempFile():
 	def terminate(self):
 		""" Close and remove the file, the file cannot be used anymore """
 		self.close()
-		os.remove(self.__path)
+		if self.__path is not None:
+			os.remove(self.__path)
+			self.__path = None
+
+class _PipeWriter:
+	"""
+		Write data to a pipe without blocking.
+
+		Data is written by chunks, when the pipe is ready to receive them.
+	"""
+
+	def __init__(self, pipe):
+		"""
+			Prepare the writer.
+
+			:param pipe: the pipe to write to.
+			:type pipe: file
+		"""
+		self.__pipe = pipe
+		_set_non_blocking(self.__pipe)
+		self.__pending = []
+		self.__position = 0
+		self.__closeAtEnd = False
+		self.__failed = False
+		self.__watchId = None
+
+	def write(self, data):
+		"""
+			Write data to the pipe.
+
+			:param data: the data to write.
+			:type data: str
+		"""
+		if self.__failed or len(data) == 0:
+			return
+		self.__pending.append(data)
+		if self.__watchId is None:
+			self.__watchId = gobject.io_add_watch(self.__pipe.fileno(),
+				gobject.IO_OUT | gobject.IO_HUP | gobject.IO_ERR,
+				self.on_writable)
+
+	def close(self):
+		""" Close the pipe when all data is written """
+		self.__closeAtEnd = True
+		if self.__watchId is None:
+			self.__close()
+
+	def has_failed(self):
+		"""
+			Indicate if the data could not be written.
+
+			:return: True if writing failed, False otherwise.
+			:rtype: bool
+		"""
+		return self.__failed
+
+	def on_writable(self, source, condition):
+		""" Manage the pipe ready event """
+		try:
+			if condition & (gobject.IO_HUP | gobject.IO_ERR):
+				raise OSError(errno.EPIPE, os.strerror(errno.EPIPE))
+			data = self.__pending[0]
+			self.__position += os.write(self.__pipe.fileno(),
+				buffer(data, self.__position, _PIPE_CHUNK_SIZE))
+			if self.__position >= len(data):
+				self.__pending.pop(0)
+				self.__position = 0
+		except OSError as e:
+			if e.errno == errno.EAGAIN:
+				return True
+			self.__failed = True
+			self.__pending = []
+		if len(self.__pending) > 0:
+			return True
+		self.__watchId = None
+		if self.__closeAtEnd:
+			self.__close()
+		return False
+
+	def cancel(self):
+		""" Stop writing and close the pipe """
+		if self.__watchId is not None:
+			gobject.source_remove(self.__watchId)
+			self.__watchId = None
+		self.__pending = []
+		self.__failed = True
+		self.__close()
+
+	def __close(self):
+		""" Close the pipe """
+		try:
+			self.__pipe.close()
+		except IOError:
+			pass
+
+class _PipeReader:
+	"""
+		Read data from a pipe without blocking.
+
+		Data is read by chunks, when available. A callback is called each time
+		data was read or the pipe was closed.
+	"""
+
+	def __init__(self, pipe, callback):
+		"""
+			Prepare the reader.
+
+			:param pipe: the pipe to read from.
+			:param callback: the function to call when data is available.
+			:type pipe: file
+			:type callback: function
+		"""
+		self.__pipe = pipe
+		_set_non_blocking(self.__pipe)
+		self.__callback = callback
+		self.__chunks = []
+		self.__watchId = gobject.io_add_watch(self.__pipe.fileno(),
+			gobject.IO_IN | gobject.IO_HUP | gobject.IO_ERR, self.on_readable)
+
+	def is_closed(self):
+		"""
+			Indicate if the end of the pipe was reached.
+
+			:return: True if pipe was closed, False otherwise.
+			:rtype: bool
+		"""
+		return self.__watchId is None
+
+	def read(self):
+		"""
+			Read the data received since last read.
+
+			:return: the data.
+			:rtype: str
+		"""
+		data = "".join(self.__chunks)
+		self.__chunks = []
+		return data
+
+	def read_line(self):
+		"""
+			Read a complete line, if available.
+
+			:return: the line, without end of line, or None if no complete line
+				was received.
+			:rtype: str
+		"""
+		data = self.read()
+		if "\n" not in data:
+			self.__chunks = [data]
+			return None
+		line, data = data.split("\n", 1)
+		self.__chunks = [data]
+		return line
+
+	def on_readable(self, source, condition):
+		""" Manage the data available event """
+		try:
+			data = os.read(self.__pipe.fileno(), _PIPE_CHUNK_SIZE)
+		except OSError as e:
+			if e.errno == errno.EAGAIN:
+				return True
+			data = ""
+		if len(data) > 0:
+			self.__chunks.append(data)
+		else:
+			self.cancel()
+		self.__callback()
+		return not self.is_closed()
+
+	def cancel(self):
+		""" Stop reading and close the pipe """
+		if self.__watchId is not None:
+			gobject.source_remove(self.__watchId)
+			self.__watchId = None
+			self.__pipe.close()
+
+class _Worker:
+	"""
+		A persistent Grammalecte worker.
+
+		The worker is a Python 3 process which loads the Grammalecte engine
+		once, and then analyzes texts sent on its standard input. It may also
+		be a connection to a Grammalecte daemon, shared by all users of the
+		desktop session, with the same protocol.
+
+		If the daemon is not running, it is started, and the connection is
+		tried again regularly from the main loop. Requests sent in the mean
+		time are written once connected. If the daemon cannot be reached, a
+		worker process is started instead.
+	"""
+
+	def __init__(self, pythonExe, gramCli, callback, onReady,
+		socketPath = None):
+		"""
+			Start the worker process, or connect to the daemon.
+
+			:param pythonExe: the Python 3 executable.
+			:param gramCli: the path to the Grammalecte command line interface.
+			:param callback: the function to call when the worker answers.
+			:param onReady: the function to call when the engine is loaded, or
+				if the worker stopped before, with a success indication.
+			:param socketPath: (optional) the socket of the daemon to connect
+				to, or None to start a worker process.
+			:type pythonExe: str
+			:type gramCli: str
+			:type callback: function
+			:type onReady: function
+			:type socketPath: str
+		"""
+		self.__command = (pythonExe, gramCli, socketPath is not None)
+		self.__callback = callback
+		self.__onReady = onReady
+		self.__ready = False
+		self.__process = None
+		self.__input = None
+		self.__output = None
+		self.__queued = []
+		self.__retryId = None
+		self.__lastId = 0
+		if socketPath is None:
+			self.__start_process()
+		elif not self.__connect(socketPath):
+			self.__socketPath = socketPath
+			self.__attempts = 0
+			self.__daemonExited = False
+			_start_daemon(pythonExe, gramCli, socketPath, self.__on_daemon_exit)
+			self.__retryId = gobject.timeout_add(
+				int(_DAEMON_CONNECT_DELAY * 1000), self.__on_retry)
+
+	def __start_process(self):
+		""" Start a dedicated worker process """
+		self.__process = subprocess.Popen(
+			[self.__command[0], _WORKER_SCRIPT, self.__command[1]],
+			stdin = subprocess.PIPE,
+			stdout = subprocess.PIPE)
+		self.__open(self.__process.stdin, self.__process.stdout)
+
+	def __connect(self, socketPath):
+		"""
+			Try to connect to the daemon.
+
+			:param socketPath: the socket of the daemon.
+			:type socketPath: str
+			:return: True if connected, False otherwise.
+			:rtype: bool
+		"""
+		connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			connection.connect(socketPath)
+			self.__open(os.fdopen(os.dup(connection.fileno()), "wb"),
+				os.fdopen(os.dup(connection.fileno()), "rb"))
+			return True
+		except socket.error:
+			return False
+		finally:
+			connection.close()
+
+	def __open(self, workerInput, workerOutput):
+		""" Start communicating with the worker """
+		self.__input = _PipeWriter(workerInput)
+		self.__output = _PipeReader(workerOutput, self.__on_output)
+		for data in self.__queued:
+			self.__input.write(data)
+		self.__queued = []
+
+	def __on_retry(self):
+		""" Try again to connect to the daemon """
+		if self.__connect(self.__socketPath):
+			self.__retryId = None
+			return False
+		self.__attempts += 1
+		if self.__daemonExited or \
+			self.__attempts >= _DAEMON_CONNECT_ATTEMPTS:
+			print _("Error: Grammalecte daemon not available, starting a" \
+				" dedicated worker")
+			self.__retryId = None
+			self.__start_process()
+			return False
+		return True
+
+	def __on_daemon_exit(self):
+		""" Manage the exit of the started daemon """
+		self.__daemonExited = True
+
+	def __write(self, data):
+		""" Write data to the worker, or keep it until connected """
+		if self.__input is None:
+			self.__queued.append(data)
+		else:
+			self.__input.write(data)
+
+	def __on_output(self):
+		""" Manage the data received from the worker """
+		if not self.__ready:
+			if self.__output.read_line() is not None:
+				self.__ready = True
+				self.__onReady(True)
+			elif self.__output.is_closed():
+				self.__onReady(False)
+		self.__callback()
+
+	def is_ready(self):
+		"""
+			Indicate if the worker has loaded the engine.
+
+			Requests may be sent before the worker is ready: they are answered
+			once the engine is loaded.
+
+			:return: True if the engine is loaded, False otherwise.
+			:rtype: bool
+		"""
+		return self.__ready
+
+	def is_for(self, pythonExe, gramCli, daemon):
+		"""
+			Indicate if the worker was started for the given command.
+
+			:param pythonExe: the Python 3 executable.
+			:param gramCli: the path to the Grammalecte command line interface.
+			:param daemon: indicate if the worker must be a daemon connection.
+			:type pythonExe: str
+			:type gramCli: str
+			:type daemon: bool
+			:return: True if worker matches the command, False otherwise.
+			:rtype: bool
+		"""
+		return self.__command == (pythonExe, gramCli, daemon)
+
+	def is_alive(self):
+		"""
+			Indicate if the worker process is still running.
+
+			:return: True if the worker is running or connecting, False
+				otherwise.
+			:rtype: bool
+		"""
+		if self.__input is None:
+			return True
+		return not self.__output.is_closed() and \
+			not self.__input.has_failed() and \
+			(self.__process is None or self.__process.poll() is None)
+
+	def send(self, text, options, rules, params):
+		"""
+			Send an analyzis request to the worker.
+
+			:param text: the text to analyze.
+			:param options: the options to set on or off.
+			:param rules: the rules to ignore.
+			:param params: the analyzis parameters of the command line.
+			:type text: str
+			:type options: dict
+			:type rules: list
+			:type params: list
+			:return: the identifier of the request.
+			:rtype: int
+		"""
+		self.__lastId += 1
+		self.__write(json.dumps({
+			"id": self.__lastId,
+			"text": text,
+			"options": options,
+			"rules": rules,
+			"params": params}) + "\n")
+		return self.__lastId
+
+	def cancel(self, requestId):
+		"""
+			Ask the worker to stop an analyzis.
+
+			The worker will still answer to the request, with a cancelled
+			indication if the analyzis was not finished yet.
+
+			:param requestId: the identifier of the request.
+			:type requestId: int
+		"""
+		self.__write(json.dumps({"cancel": requestId}) + "\n")
+
+	def receive(self):
+		"""
+			Receive an answer from the worker, if available.
+
+			:return: the answer, or None if no answer is available yet.
+			:rtype: dict
+		"""
+		if not self.__ready:
+			return None
+		line = self.__output.read_line()
+		return None if line is None else json.loads(line)
+
+	def terminate(self):
+		""" Stop the worker process, or disconnect from the daemon """
+		if self.__retryId is not None:
+			gobject.source_remove(self.__retryId)
+			self.__retryId = None
+		if self.__input is not None:
+			self.__input.cancel()
+			self.__output.cancel()
+		if self.__process is not None and self.__process.poll() is None:
+			self.__process.terminate()
+			self.__process.wait()
+
+def _get_daemon_path(pythonExe, gramCli):
+	"""
+		Get the path of the daemon socket.
+
+		The socket is in the user runtime directory, or in a private temporary
+		directory if there is no such directory. Its name depends on the
+		command used to run Grammalecte.
+
+		:param pythonExe: the Python 3 executable.
+		:param gramCli: the path to the Grammalecte command line interface.
+		:type pythonExe: str
+		:type gramCli: str
+		:return: the path of the socket, or None if no private directory is
+			available.
+		:rtype: str
+	"""
+	directory = os.environ.get("XDG_RUNTIME_DIR")
+	if not directory or not os.path.isdir(directory):
+		directory = os.path.join(tempfile.gettempdir(),
+			"pluma-grammalecte-{}".format(os.getuid()))
+		try:
+			os.mkdir(directory, 0700)
+		except OSError as e:
+			if e.errno != errno.EEXIST:
+				return None
+		stat = os.lstat(directory)
+		if stat.st_uid != os.getuid() or stat.st_mode & 0077 != 0:
+			return None
+	return os.path.join(directory, "pluma-grammalecte-{}.sock".format(
+		hashlib.md5(pythonExe + "\0" + gramCli).hexdigest()[:12]))
+
+def _start_daemon(pythonExe, gramCli, socketPath, onExit):
+	"""
+		Start the Grammalecte daemon in its own session.
+
+		:param pythonExe: the Python 3 executable.
+		:param gramCli: the path to the Grammalecte command line interface.
+		:param socketPath: the path of the socket.
+		:param onExit: the function to call when the daemon exits.
+		:type pythonExe: str
+		:type gramCli: str
+		:type socketPath: str
+		:type onExit: function
+	"""
+	with open(os.devnull, "r+") as devNull:
+		process = subprocess.Popen(
+			[pythonExe, _WORKER_SCRIPT, gramCli, "--daemon", socketPath],
+			stdin = devNull, stdout = devNull, stderr = devNull,
+			close_fds = True, preexec_fn = os.setsid)
+	gobject.child_watch_add(process.pid, lambda pid, status: onExit())
+
+def _create_worker(pythonExe, gramCli, daemon, callback, onReady):
+	"""
+		Create a persistent worker.
+
+		If asked, the worker is a connection to the daemon, which is started
+		if needed. If there is no private directory for the daemon socket, a
+		worker process is started instead.
+
+		:param pythonExe: the Python 3 executable.
+		:param gramCli: the path to the Grammalecte command line interface.
+		:param daemon: indicate if the daemon must be used.
+		:param callback: the function to call when the worker answers.
+		:param onReady: the function to call when the engine is loaded, or
+			if the worker stopped before, with a success indication.
+		:type pythonExe: str
+		:type gramCli: str
+		:type daemon: bool
+		:type callback: function
+		:type onReady: function
+		:return: the worker.
+		:rtype: _Worker
+	"""
+	socketPath = _get_daemon_path(pythonExe, gramCli) if daemon else None
+	return _Worker(pythonExe, gramCli, callback, onReady, socketPath)
 
 class _State:
 	""" A state of the state machine """
-	def __init__(self, analyzer):
+	def __init__(self, slot):
 		""" Initialize the state """
-		self._analyzer = analyzer
+		self._slot = slot
+		self._analyzer = slot.analyzer
 
 	def execute(self):
 		"""
@@ -161,30 +729,450 @@ class _State:
 		"""
 		pass
 
+	def cancel(self):
+		"""
+			Cancel the state.
+
+			The state must stop watching the events it was waiting for.
+		"""
+		pass
+
+	def get_analysis(self):
+		"""
+			Get the analyzis running in this state.
+
+			:return: the analyzis, or None if no analyzis is running.
+			:rtype: _Analysis
+		"""
+		return None
+
+	def supersede(self, requester):
+		"""
+			Indicate that a new analyzis was requested.
+
+			If the state is analyzing an obsolete text of the requester, the
+			analyzis should be stopped as soon as possible.
+
+			:param requester: the requester.
+			:type requester: GrammalecteRequester
+		"""
+		pass
+
+	def _end_shard(self, shard, analyzerFormat):
+		"""
+			End the analyzis of a shard.
+
+			If it was the last running shard, the analyzis is finished.
+
+			:param shard: the shard.
+			:param analyzerFormat: the last Grammalecte result for the shard, or
+				None if Grammalecte failed.
+			:type shard: _Shard
+			:type analyzerFormat: list
+		"""
+		if analyzerFormat is not None:
+			shard.add_result(analyzerFormat)
+		if shard.analysis.end_shard():
+			self._emit_finished(shard.analysis)
+
+	def _emit_finished(self, analysis):
+		"""
+			Finish the analyzis and send its result to the requester.
+
+			Result of an obsolete analyzis is replaced with None.
+
+			:param analysis: the analyzis.
+			:type analysis: _Analysis
+		"""
+		result = analysis.finish()
+		self._analyzer.emit("analyze-finished", analysis.requester,
+			None if analysis.is_obsolete() else result)
+
+def _get_option_lists(config):
+	"""
+		Get the options to set on or off and the rules to ignore.
+
+		:param config: the configuration to read.
+		:type config: GrammalecteConfig
+		:return: the lists of options on, options off and ignored rules.
+		:rtype: tuple
+	"""
+	optionOn, optionOff = [], []
+	options = config.get_value(GrammalecteConfig.ANALYZE_OPTIONS)
+	for optionName in options:
+		if optionName == GrammalecteConfig.GRAMMALECTE_OPTION_SPELLING:
+			pass
+		elif options[optionName]:
+			optionOn.append(optionName)
+		else:
+			optionOff.append(optionName)
+	rules = config.get_all_values(GrammalecteConfig.IGNORED_RULES)
+	return optionOn, optionOff, rules
+
+class _Analysis:
+	"""
+		An analyzis of the text of a requester.
+
+		The text is split in paragraphs, and only the paragraphs for which no
+		result is known yet, neither for the requester nor in the result or
+		disk caches, are sent to Grammalecte. Results of the other paragraphs
+		are reused, with their lines shifted.
+		If the text to send is big, it is split in shards which are analyzed at
+		the same time in different slots.
+	"""
+
+	def __init__(self, analyzer, requester, config):
+		"""
+			Prepare the analyzis.
+
+			:param analyzer: the analyzer.
+			:param requester: the requester of the analyzis.
+			:param config: the configuration of the requester.
+			:type analyzer: GrammalecteAnalyzer
+			:type requester: GrammalecteRequester
+			:type config: GrammalecteConfig
+		"""
+		self.__analyzer = analyzer
+		self.requester = requester
+		self.config = config
+		self.__generation = requester.get_generation()
+		optionOn, optionOff, self.rules = _get_option_lists(config)
+		self.options = dict([(option, True) for option in optionOn] +
+			[(option, False) for option in optionOff])
+		self.__optionsKey = (tuple(sorted(optionOn)),
+			tuple(sorted(optionOff)), tuple(sorted(self.rules)))
+		self.__paragraphs = self.__split(analyzer, requester)
+		self.__known = analyzer._get_known_results(
+			requester, self.__optionsKey)
+		self.__cache = analyzer._get_result_cache()
+		missing = []
+		missingKeys = set()
+		for paragraph in self.__paragraphs:
+			if paragraph.key in self.__known or paragraph.key in missingKeys:
+				continue
+			parResult = self.__cache.get((paragraph.key, self.__optionsKey))
+			if parResult is None:
+				missingKeys.add(paragraph.key)
+				missing.append(paragraph)
+			else:
+				self.__known[paragraph.key] = parResult
+		self.__diskResults = {}
+		self.__pending = sort_paragraphs(self.__read_disk_cache(missing),
+			requester.get_cursor_line(), requester.get_visible_lines())
+		self.__shards = collections.deque()
+		self.__running = 0
+		self.__aborted = False
+		self.__progressed = False
+		self.__progressTime = 0
+
+	@staticmethod
+	def __split(analyzer, requester):
+		"""
+			Split the text of the requester in paragraphs.
+
+			The paragraphs of the previous text of the requester are reused if
+			the lines changed since are known.
+
+			:param analyzer: the analyzer.
+			:param requester: the requester of the analyzis.
+			:type analyzer: GrammalecteAnalyzer
+			:type requester: GrammalecteRequester
+			:return: the paragraphs of the text.
+			:rtype: list
+		"""
+		dirtyLines = requester.get_dirty_lines()
+		text = requester.get_text()
+		previous = analyzer._get_known_paragraphs(requester)
+		if dirtyLines is None or previous is None:
+			paragraphs = split_paragraphs(text)
+		else:
+			paragraphs = update_paragraphs(previous, text, dirtyLines)
+		analyzer._set_known_paragraphs(requester, paragraphs)
+		return paragraphs
+
+	def __read_disk_cache(self, paragraphs):
+		"""
+			Read the results of the paragraphs from the disk cache.
+
+			Found results are also put in the result cache.
+
+			:param paragraphs: the paragraphs to search.
+			:type paragraphs: list
+			:return: the paragraphs not found in the disk cache.
+			:rtype: list
+		"""
+		self.__diskCache = self.__analyzer._get_disk_cache()
+		if self.__diskCache is None or len(paragraphs) == 0:
+			self.__diskCache = None
+			return paragraphs
+		self.__diskSuffix = hashlib.md5(json.dumps([self.__optionsKey,
+			self.__analyzer._get_engine_version(self.config)])).hexdigest()
+		found = self.__diskCache.get_all(
+			[p.key + self.__diskSuffix for p in paragraphs])
+		notFound = []
+		for paragraph in paragraphs:
+			parResult = found.get(paragraph.key + self.__diskSuffix)
+			if parResult is None:
+				notFound.append(paragraph)
+			else:
+				self.__known[paragraph.key] = parResult
+				self.__cache.put((paragraph.key, self.__optionsKey), parResult)
+		return notFound
+
+	def is_complete(self):
+		"""
+			Indicate if the result is known without calling Grammalecte.
+
+			:return: True if no paragraph needs to be analyzed.
+			:rtype: bool
+		"""
+		return len(self.__pending) == 0
+
+	def is_obsolete(self):
+		"""
+			Indicate if the text of the requester changed since the analyzis
+			was started.
+
+			:return: True if the analyzis is obsolete.
+			:rtype: bool
+		"""
+		return self.__generation != self.requester.get_generation()
+
+	def split(self, maxCount):
+		"""
+			Split the paragraphs to analyze in shards.
+
+			The count of shards depends on the size of the text to analyze.
+
+			:param maxCount: the maximum count of shards.
+			:type maxCount: int
+		"""
+		shardSize = self.config.get_value(
+			GrammalecteConfig.ANALYZE_SHARD_SIZE) * 1024
+		size = sum([len(p.text) for p in self.__pending])
+		count = max(1, min(maxCount, (size - 1) // max(1, shardSize) + 1))
+		for paragraphs in split_shards(self.__pending, count):
+			self.__shards.append(_Shard(self, paragraphs))
+
+	def take_shard(self):
+		"""
+			Take a shard to analyze.
+
+			:return: the shard, or None if no shard needs to be analyzed.
+			:rtype: _Shard
+		"""
+		if self.is_obsolete():
+			self.__shards.clear()
+		if len(self.__shards) == 0:
+			return None
+		self.__running += 1
+		return self.__shards.popleft()
+
+	def end_shard(self):
+		"""
+			Indicate that the analyzis of a shard is ended.
+
+			:return: True if the analyzis of all shards is ended.
+			:rtype: bool
+		"""
+		self.__running -= 1
+		if self.is_obsolete():
+			self.__shards.clear()
+		return not self.__aborted and self.__running == 0 and \
+			len(self.__shards) == 0
+
+	def abort(self):
+		"""
+			Stop the analyzis after a failure.
+
+			The shards not taken yet are dropped, and the analyzis will never
+			be considered as ended.
+
+			:return: True if the analyzis was running, False if it was already
+				aborted.
+			:rtype: bool
+		"""
+		if self.__aborted:
+			return False
+		self.__aborted = True
+		self.__shards.clear()
+		return True
+
+	def _store_results(self, paragraphs, results):
+		"""
+			Store the results of analyzed paragraphs.
+
+			Results are written to the disk cache at once, when the analyzis
+			is finished.
+
+			:param paragraphs: the analyzed paragraphs.
+			:param results: the result of each paragraph.
+			:type paragraphs: list
+			:type results: list
+		"""
+		for paragraph, parResult in zip(paragraphs, results):
+			self.__known[paragraph.key] = parResult
+			self.__cache.put((paragraph.key, self.__optionsKey), parResult)
+			if self.__diskCache is not None:
+				self.__diskResults[paragraph.key + self.__diskSuffix] = \
+					parResult
+		self.__progressed = True
+
+	def get_result(self):
+		"""
+			Get the result for the paragraphs analyzed so far.
+
+			:return: the result for the text of the requester, without the
+				paragraphs which are not analyzed yet.
+			:rtype: list
+		"""
+		return [shift_result(self.__known[p.key], p.firstLine)
+			for p in self.__paragraphs if p.key in self.__known and
+			not is_empty_result(self.__known[p.key])]
+
+	def get_progress(self):
+		"""
+			Get the partial result, if it should be sent to the requester.
+
+			:return: the result for the paragraphs analyzed so far, or None if
+				nothing changed or the previous one was sent too recently.
+			:rtype: list
+		"""
+		if not self.__progressed or self.is_obsolete() or \
+			time.time() - self.__progressTime < _PROGRESS_DELAY:
+			return None
+		self.__progressed = False
+		self.__progressTime = time.time()
+		return self.get_result()
+
+	def finish(self):
+		"""
+			Finish the analyzis.
+
+			:return: the result for the whole text of the requester.
+			:rtype: list
+		"""
+		if self.__diskCache is not None:
+			self.__diskCache.put_all(self.__diskResults)
+			self.__diskResults = {}
+		results = {}
+		for paragraph in self.__paragraphs:
+			if paragraph.key in self.__known:
+				results[paragraph.key] = self.__known[paragraph.key]
+		self.__analyzer._set_known_results(
+			self.requester, self.__optionsKey, results)
+		return self.get_result()
+
+class _Shard:
+	""" A part of an analyzis, which is sent to Grammalecte at once """
+
+	def __init__(self, analysis, paragraphs):
+		"""
+			Prepare the shard.
+
+			:param analysis: the analyzis the shard is part of.
+			:param paragraphs: the paragraphs of the shard.
+			:type analysis: _Analysis
+			:type paragraphs: list
+		"""
+		self.analysis = analysis
+		self.__paragraphs = paragraphs
+		self.text, self.__starts = compose_paragraphs(paragraphs)
+		self.__done = 0
+
+	def add_result(self, analyzerFormat, lineCount = None):
+		"""
+			Add a Grammalecte result for the beginning of the text.
+
+			:param analyzerFormat: the Grammalecte result for the paragraphs
+				analyzed since the previous call.
+			:param lineCount: the number of lines of the text which have been
+				analyzed, or None if the whole text is.
+			:type analyzerFormat: list
+			:type lineCount: int
+		"""
+		done = len(self.__paragraphs) if lineCount is None \
+			else bisect.bisect_left(self.__starts, lineCount)
+		if done <= self.__done:
+			return
+		self.analysis._store_results(self.__paragraphs[self.__done:done],
+			dispatch_result(analyzerFormat, self.__starts[self.__done:done]))
+		self.__done = done
+
 class _StateWaiting(_State):
 	"""
 		The waiting state.
 
-		In this state, the analyzer is waiting for a requester to ask for
-		an analyzis.
+		In this state, the slot is waiting for a shard of a running analyzis
+		or for a requester to ask for an analyzis.
 	"""
 
-	def __init__(self, analyzer):
+	def __init__(self, slot):
 		""" Initialize the state """
-		_State.__init__(self, analyzer)
+		_State.__init__(self, slot)
+		self.__analysis = None
+
+	def get_analysis(self):
+		""" Get the analyzis of the shard being started, if any """
+		return self.__analysis
 
 	def _is_transition_open(self):
 		""" Test if transition is open """
-		return not self._analyzer._queue.empty()
+		self.__requester = None
+		self.__shard = self._analyzer._take_shard()
+		if self.__shard is None:
+			self.__requester = self._analyzer._queue.get(
+				self._analyzer._get_busy_requesters())
+		return self.__shard is not None or self.__requester is not None
 
 	def _start_next_state(self):
 		""" Initialize the next state """
-		requester = self._analyzer._queue.get()
+		shard = self.__shard
+		if shard is None:
+			analysis = self.__start_analysis(self.__requester)
+			if analysis is None:
+				return _StateWaiting(self._slot)
+			shard = analysis.take_shard()
+		self.__analysis = shard.analysis
+		worker = self._slot.get_worker(shard.analysis.config)
+		if worker is None:
+			return self._start_process(shard)
+		requestId = worker.send(shard.text, shard.analysis.options,
+			shard.analysis.rules, shard.analysis.config.get_value(
+			GrammalecteConfig.GRAMMALECTE_ANALYZE_PARAMS))
+		return _StateWorking(self._slot, shard, worker, requestId)
+
+	def __start_analysis(self, requester):
+		"""
+			Start the analyzis for the requester.
+
+			:param requester: the requester.
+			:type requester: GrammalecteRequester
+			:return: the analyzis, or None if nothing needs to be sent to
+				Grammalecte.
+			:rtype: _Analysis
+		"""
 		config = requester.get_config()
 		if config is None:
-			return self
-		self._analyzer._input.write(requester.get_text())
+			return None
+		analysis = _Analysis(self._analyzer, requester, config)
 		self._analyzer.emit("analyze-started", requester)
+		if analysis.is_complete():
+			self._emit_finished(analysis)
+			return None
+		analysis.split(self._analyzer._get_free_slot_count())
+		return analysis
+
+	def _start_process(self, shard):
+		"""
+			Start a Grammalecte process for the shard.
+
+			:param shard: the shard to analyze.
+			:type shard: _Shard
+			:return: the analyzing state.
+			:rtype: _StateAnalyzing
+		"""
+		config = shard.analysis.config
 		processArgs = []
 		processArgs.append(config.get_value(
 			GrammalecteConfig.GRAMMALECTE_PYTHON_EXE))
@@ -195,24 +1183,24 @@ class _StateWaiting(_State):
 		self.__build_option_params(config, processArgs)
 		processArgs.append(config.get_value(
 			GrammalecteConfig.GRAMMALECTE_CLI_FILE))
-		processArgs.append(self._analyzer._input.get_path())
-		process = subprocess.Popen(
-			processArgs,
-			stdout = self._analyzer._output.open_write(),
-			stderr = self._analyzer._error.open_write())
-		return _StateAnalyzing(self._analyzer, requester, process)
+		inputFile = _TempFile()
+		try:
+			inputFile.write(shard.text)
+			processArgs.append(inputFile.get_path())
+			with open(os.devnull, 'r') as nullInput:
+				process = subprocess.Popen(
+					processArgs,
+					stdin = nullInput,
+					stdout = subprocess.PIPE,
+					stderr = subprocess.PIPE)
+		except:
+			inputFile.terminate()
+			raise
+		return _StateAnalyzing(self._slot, shard, process, inputFile)
 
 	def __build_option_params(self, config, params):
 		""" Build the option on/off parameters """
-		optionOn, optionOff = [], []
-		options = config.get_value(GrammalecteConfig.ANALYZE_OPTIONS)
-		for optionName in options:
-			if optionName == GrammalecteConfig.GRAMMALECTE_OPTION_SPELLING:
-				pass
-			elif options[optionName]:
-				optionOn.append(optionName)
-			else:
-				optionOff.append(optionName)
+		optionOn, optionOff, rules = _get_option_lists(config)
 		if len(optionOn) > 0:
 			params.append(config.get_value(
 				GrammalecteConfig.GRAMMALECTE_CLI_OPTS_ON))
@@ -223,52 +1211,250 @@ class _StateWaiting(_State):
 				GrammalecteConfig.GRAMMALECTE_CLI_OPTS_OFF))
 		for option in optionOff:
 			params.append(option)
-		options = config.get_all_values(GrammalecteConfig.IGNORED_RULES)
-		if len(options) > 0:
+		if len(rules) > 0:
 			params.append(config.get_value(
 				GrammalecteConfig.GRAMMALECTE_CLI_RULES_OFF))
-		for option in options:
-			params.append(option)
+		for rule in rules:
+			params.append(rule)
 
 class _StateAnalyzing(_State):
 	"""
 		The analyzing state.
 
-		In this state, the analyzer has launched an analyzis and is waiting
-		for process to complete.
+		In this state, the slot has launched an analyzis and is waiting for
+		process to complete. The text is given to the process in a temporary
+		file, removed when the state ends, and its outputs are read while it
+		is running.
 	"""
 
-	def __init__(self, analyzer, requester, process):
+	def __init__(self, slot, shard, process, inputFile):
 		""" Initialize the state """
-		_State.__init__(self, analyzer)
-		self.__requester = requester
+		_State.__init__(self, slot)
+		self.__shard = shard
+		self.__analysis = shard.analysis
 		self.__process = process
+		self.__returnCode = None
+		self.__superseded = False
+		self.__input = inputFile
+		self.__output = _PipeReader(process.stdout, self._analyzer._wake_up)
+		self.__error = _PipeReader(process.stderr, self._analyzer._wake_up)
+		self.__outputData = []
+		self.__errorData = []
+		self.__watchId = gobject.child_watch_add(
+			process.pid, self.on_process_exit)
+
+	def on_process_exit(self, pid, status):
+		""" Manage the process exit event """
+		self.__watchId = None
+		self.__returnCode = os.WEXITSTATUS(status) \
+			if os.WIFEXITED(status) else -1
+		self._analyzer._wake_up()
 
 	def _is_transition_open(self):
 		""" Test if transition is open """
-		return self.__process.poll() is not None
+		self.__outputData.append(self.__output.read())
+		self.__errorData.append(self.__error.read())
+		return self.__returnCode is not None and \
+			self.__output.is_closed() and self.__error.is_closed()
+
+	def cancel(self):
+		""" Cancel the state """
+		if self.__watchId is not None:
+			gobject.source_remove(self.__watchId)
+			self.__watchId = None
+		self.__input.terminate()
+		self.__output.cancel()
+		self.__error.cancel()
+
+	def get_analysis(self):
+		""" Get the running analyzis """
+		return self.__analysis
+
+	def supersede(self, requester):
+		""" Kill the process if its analyzis is obsolete """
+		if self.__analysis.requester is not requester or \
+			not self.__analysis.is_obsolete() or \
+			self.__returnCode is not None or self.__superseded:
+			return
+		self.__superseded = True
+		self.__process.terminate()
 
 	def _start_next_state(self):
 		""" Initialize the next state """
-		result = []
-		if self.__process.returncode == 0:
-			result = json.loads(self._analyzer._output.read())["data"]
-		else:
+		self.__input.terminate()
+		result = None
+		if self.__returnCode == 0 and not self.__superseded:
+			result = json.loads("".join(self.__outputData))["data"]
+		elif not self.__superseded:
 			print _("Error: Grammalecte process did not terminate" \
-				" properly:\n{}").format(self._analyzer._error.read())
-		self._analyzer._output.close()
-		self._analyzer._error.close()
-		self._analyzer.emit("analyze-finished", self.__requester, result)
-		return _StateWaiting(self._analyzer)
+				" properly:\n{}").format("".join(self.__errorData))
+		self._end_shard(self.__shard, result)
+		return _StateWaiting(self._slot)
+
+class _StateWorking(_State):
+	"""
+		The working state.
+
+		In this state, the slot has sent a request to its persistent worker
+		and is waiting for its answer. The worker answers paragraph by
+		paragraph, and the partial results are regularly sent to the
+		requester. If the worker fails, the analyzis is made by a Grammalecte
+		process instead.
+	"""
+
+	def __init__(self, slot, shard, worker, requestId):
+		""" Initialize the state """
+		_State.__init__(self, slot)
+		self.__shard = shard
+		self.__analysis = shard.analysis
+		self.__worker = worker
+		self.__requestId = requestId
+		self.__answer = None
+		self.__superseded = False
+
+	def get_analysis(self):
+		""" Get the running analyzis """
+		return self.__analysis
+
+	def _is_transition_open(self):
+		""" Test if transition is open """
+		while self.__answer is None:
+			answer = self.__worker.receive()
+			if answer is None:
+				self.__send_progress()
+				return not self.__worker.is_alive()
+			if answer["id"] != self.__requestId:
+				continue
+			if "line" in answer:
+				self.__shard.add_result(answer["data"], answer["line"])
+			else:
+				self.__answer = answer
+		return True
+
+	def supersede(self, requester):
+		""" Ask the worker to drop the analyzis if it is obsolete """
+		if self.__analysis.requester is not requester or \
+			not self.__analysis.is_obsolete() or self.__superseded:
+			return
+		self.__superseded = True
+		self.__worker.cancel(self.__requestId)
+
+	def __send_progress(self):
+		""" Send the partial result if needed """
+		result = self.__analysis.get_progress()
+		if result is not None:
+			self._analyzer.emit(
+				"analyze-progress", self.__analysis.requester, result)
+
+	def _start_next_state(self):
+		""" Initialize the next state """
+		if self.__answer is not None and "cancelled" in self.__answer:
+			self._end_shard(self.__shard, None)
+			return _StateWaiting(self._slot)
+		if self.__answer is None or "end" not in self.__answer:
+			print _("Error: Grammalecte worker failed, falling back to" \
+				" Grammalecte process:\n{}").format(
+				"" if self.__answer is None else self.__answer["error"])
+			self._analyzer._disable_worker(self.__analysis.config)
+			if self.__analysis.is_obsolete():
+				self._end_shard(self.__shard, None)
+				return _StateWaiting(self._slot)
+			return _StateWaiting(self._slot)._start_process(self.__shard)
+		self._end_shard(self.__shard, [])
+		return _StateWaiting(self._slot)
+
+class _Slot:
+	"""
+		A slot of the analyzer, in which one analyzis can run at a time.
+
+		Each slot has its own state machine, and its own persistent worker,
+		which is started when first needed.
+	"""
+
+	def __init__(self, analyzer):
+		"""
+			Initialize the slot.
+
+			:param analyzer: the analyzer.
+			:type analyzer: GrammalecteAnalyzer
+		"""
+		self.analyzer = analyzer
+		self.state = _StateWaiting(self)
+		self.__worker = None
+
+	def get_worker(self, config):
+		"""
+			Get the persistent worker to use with the given configuration.
+
+			The worker is started if needed.
+
+			:param config: the configuration of the requester.
+			:type config: GrammalecteConfig
+			:return: the worker, or None if no worker should be used.
+			:rtype: _Worker
+		"""
+		if not self.analyzer._is_worker_active(config):
+			return None
+		pythonExe = config.get_value(GrammalecteConfig.GRAMMALECTE_PYTHON_EXE)
+		gramCli = config.get_value(GrammalecteConfig.GRAMMALECTE_CLI)
+		daemon = config.get_value(GrammalecteConfig.GRAMMALECTE_DAEMON_ACTIVE)
+		if self.__worker is not None and \
+			not (self.__worker.is_alive() and
+			self.__worker.is_for(pythonExe, gramCli, daemon)):
+			self.terminate_worker()
+		if self.__worker is None:
+			self.__worker = _create_worker(pythonExe, gramCli, daemon,
+				self.analyzer._wake_up, self.analyzer._on_worker_ready)
+		return self.__worker
+
+	def is_worker_ready(self):
+		"""
+			Indicate if the persistent worker has loaded the engine.
+
+			:return: True if the worker is ready, False otherwise.
+			:rtype: bool
+		"""
+		return self.__worker is not None and self.__worker.is_ready()
+
+	def terminate_worker(self):
+		""" Stop the persistent worker, if any """
+		if self.__worker is not None:
+			self.__worker.terminate()
+			self.__worker = None
+
+	def terminate(self):
+		""" Stop the running analyzis and the worker """
+		if self.state is not None:
+			self.state.cancel()
+		self.state = None
+		self.terminate_worker()
 
 class GrammalecteAnalyzer(gobject.GObject):
 	"""
 		Class managing grammar analyzis.
 
-		There should not be many instances of the analyzer. A good choice is to
-		create one instance per window. Each instance will treat all recieved
-		requests one by one. Requests are enqueued in a FIFO.
-		This class is managed as a state machine.
+		There should be only one instance of the analyzer, shared by all the
+		windows, which is given by the acquire method. This instance runs a
+		configurable count of analyzis at the same time, each one in its own
+		slot, but never two analyzis for the same requester. Requests are
+		enqueued in a priority queue, in which each requester has at most one
+		pending request, and clients of a same priority are served in turn.
+		Only the paragraphs which changed since the previous analyzis of a
+		requester are sent to Grammalecte, starting with the ones seen by the
+		user. A big text is split in shards, analyzed in the free slots.
+		Analyzis are made by a persistent worker if active, or by a new
+		Grammalecte process for each request otherwise. The worker gives its
+		results paragraph by paragraph, which are sent to the requester
+		before the end of the analyzis. When a requester asks for a new
+		analyzis while its previous text is being analyzed, the obsolete
+		analyzis is stopped and its result is replaced by None.
+		Each slot is managed as a state machine, which is run when an event
+		occurs (new request, end of process, worker answer).
+		A worker may be started in advance with the prewarm method, so that
+		the first analyzis does not wait for the engine to load, the other
+		ones being started when first needed. The engine-ready signal is
+		emitted when a worker has loaded the engine, and the engine-failed
+		signal when a worker stopped before.
 	"""
 
 	__gsignals__ = {
@@ -276,54 +1462,394 @@ class GrammalecteAnalyzer(gobject.GObject):
 			gobject.SIGNAL_RUN_LAST,
 			gobject.TYPE_NONE,
 			(gobject.TYPE_PYOBJECT,)),
+		"analyze-progress": (
+			gobject.SIGNAL_RUN_LAST,
+			gobject.TYPE_NONE,
+			(gobject.TYPE_PYOBJECT, gobject.TYPE_PYOBJECT)),
 		"analyze-finished": (
 			gobject.SIGNAL_RUN_LAST,
 			gobject.TYPE_NONE,
-			(gobject.TYPE_PYOBJECT, gobject.TYPE_PYOBJECT))
+			(gobject.TYPE_PYOBJECT, gobject.TYPE_PYOBJECT)),
+		"engine-ready": (
+			gobject.SIGNAL_RUN_LAST,
+			gobject.TYPE_NONE,
+			()),
+		"engine-failed": (
+			gobject.SIGNAL_RUN_LAST,
+			gobject.TYPE_NONE,
+			())
 	}
 
+	__resultCache = None
+	__diskCache = None
+	__sharedInstance = None
+	__sharedCount = 0
+
+	@staticmethod
+	def acquire():
+		"""
+			Get the analyzer shared by all clients.
+
+			The analyzer is created if needed. Each call must be followed by a
+			call to release when the analyzer is not used anymore.
+
+			:return: the shared analyzer.
+			:rtype: GrammalecteAnalyzer
+		"""
+		if GrammalecteAnalyzer.__sharedInstance is None:
+			GrammalecteAnalyzer.__sharedInstance = GrammalecteAnalyzer()
+		GrammalecteAnalyzer.__sharedCount += 1
+		return GrammalecteAnalyzer.__sharedInstance
+
+	def release(self):
+		"""
+			Release the analyzer given by acquire.
+
+			The shared analyzer is terminated when it is not used anymore.
+		"""
+		if self is not GrammalecteAnalyzer.__sharedInstance:
+			return
+		GrammalecteAnalyzer.__sharedCount -= 1
+		if GrammalecteAnalyzer.__sharedCount == 0:
+			GrammalecteAnalyzer.__sharedInstance = None
+			self.terminate()
+
 	def __init__(self):
 		""" Initialize the analyzer """
 		gobject.GObject.__init__(self)
 
 		# Define instance data
-		self._queue = Queue.Queue()
-		self._input = _TempFile()
-		self._output = _TempFile()
-		self._error = _TempFile()
-		self.__state = _StateWaiting(self)
+		self._queue = GRequestQueue(
+			lambda requester: requester.get_priority(),
+			lambda requester: requester.get_client())
+		self.__disabledWorkers = set()
+		self.__knownResults = weakref.WeakKeyDictionary()
+		self.__knownParagraphs = weakref.WeakKeyDictionary()
+		self.__wakeUpId = None
 
-		# Define timer
+		# Define the slots
 		config = GrammalecteConfig()
-		gobject.timeout_add(
-			config.get_value(GrammalecteConfig.AUTO_ANALYZE_TIMER),
-			self.__run)
+		self.__slots = [_Slot(self) for i in range(max(1,
+			config.get_value(GrammalecteConfig.ANALYZE_PARALLEL_COUNT)))]
 
-	def __run(self):
-		if self.__state is None or self._queue is None:
-			return False
-		else:
-			try:
-				self.__state = self.__state.execute()
-				return True
-			except Exception as e:
-				print _("Exception: {}").format(e)
-				self.terminate()
+		# Define the result cache, shared by all analyzers
+		if GrammalecteAnalyzer.__resultCache is None:
+			GrammalecteAnalyzer.__resultCache = GResultCache(
+				config.get_value(GrammalecteConfig.CACHE_MAX_ENTRIES),
+				config.get_value(GrammalecteConfig.CACHE_MAX_SIZE) * 1024)
+			if config.get_value(GrammalecteConfig.DISK_CACHE_ACTIVE):
+				GrammalecteAnalyzer.__diskCache = GDiskCache(
+					config.get_value(GrammalecteConfig.DISK_CACHE_FILE),
+					config.get_value(GrammalecteConfig.DISK_CACHE_MAX_SIZE)
+					* 1024)
+
+	def _wake_up(self):
+		"""
+			Run the state machine because an event occured.
+
+			States are executed until the state machine has to wait for
+			another event. If a state fails, only the analyzis of its slot is
+			stopped.
+		"""
+		changed = True
+		while changed and self.__slots is not None:
+			changed = False
+			for slot in self.__slots or []:
+				if slot.state is None:
+					continue
+				try:
+					state = slot.state.execute()
+				except Exception as e:
+					print _("Exception: {}").format(e)
+					state = self.__reset_slot(slot)
+				if state is not slot.state:
+					slot.state = state
+					changed = True
+
+	def __reset_slot(self, slot):
+		"""
+			Stop the analyzis of a slot after a failure.
+
+			The requester is told that the analyzis is finished without result.
+
+			:param slot: the slot.
+			:type slot: _Slot
+			:return: the new state of the slot.
+			:rtype: _State
+		"""
+		analysis = slot.state.get_analysis()
+		slot.state.cancel()
+		slot.terminate_worker()
+		if analysis is not None and analysis.abort():
+			self.emit("analyze-finished", analysis.requester, None)
+		return _StateWaiting(slot)
+
+	def __on_idle(self):
+		""" Run the state machine when main loop is idle """
+		self.__wakeUpId = None
+		self._wake_up()
+		return False
 
 	def add_request(self, requester):
 		"""
 			Request analyzis for the given requester.
 
+			Nothing is done if the analyzer is terminated.
+
 			:param requester: The view requesting analyzis.
 			:type requester: GrammalecteRequester
 		"""
+		if self._queue is None:
+			return
 		self._queue.put(requester)
+		for slot in self.__slots or []:
+			if slot.state is not None:
+				slot.state.supersede(requester)
+		if self.__wakeUpId is None:
+			self.__wakeUpId = gobject.idle_add(self.__on_idle)
+
+	def prewarm(self, config):
+		"""
+			Start a persistent worker in advance.
+
+			Only the worker of the first slot is started, the other ones being
+			started when first needed. The engine-ready signal is emitted as
+			soon as a worker has loaded the engine, or the engine-failed signal
+			if it stopped before.
+
+			:param config: the configuration to start the worker with.
+			:type config: GrammalecteConfig
+			:return: True if a worker is loading the engine, False if it is
+				already ready or if no worker should be used.
+			:rtype: bool
+		"""
+		if self.__slots is None or not self._is_worker_active(config):
+			return False
+		if self.is_engine_ready():
+			return False
+		self.__slots[0].get_worker(config)
+		return not self.is_engine_ready()
+
+	def is_engine_ready(self):
+		"""
+			Indicate if a persistent worker has loaded the engine.
+
+			:return: True if a worker is ready, False otherwise.
+			:rtype: bool
+		"""
+		return self.__slots is not None and \
+			any([slot.is_worker_ready() for slot in self.__slots])
+
+	def _on_worker_ready(self, ready):
+		"""
+			Manage the end of the engine loading by a worker.
+
+			:param ready: True if the engine is loaded, False if the worker
+				stopped before.
+			:type ready: bool
+		"""
+		self.emit("engine-ready" if ready else "engine-failed")
+
+	def get_queue_depth(self):
+		"""
+			Get the count of requests waiting for an analyzis.
+
+			:return: the count of pending requests.
+			:rtype: int
+		"""
+		return 0 if self._queue is None else self._queue.get_queue_depth()
+
+	def _get_known_results(self, requester, optionsKey):
+		"""
+			Get the paragraph results known for the requester.
+
+			:param requester: the requester.
+			:param optionsKey: the options used for the analyzis.
+			:type requester: GrammalecteRequester
+			:type optionsKey: tuple
+			:return: the results of the paragraphs, by paragraph key.
+			:rtype: dict
+		"""
+		known = self.__knownResults.get(requester)
+		if known is None or known[0] != optionsKey:
+			return {}
+		return dict(known[1])
+
+	def _set_known_results(self, requester, optionsKey, results):
+		"""
+			Set the paragraph results known for the requester.
+
+			Only the results of the paragraphs of the last analyzed text are
+			kept.
+
+			:param requester: the requester.
+			:param optionsKey: the options used for the analyzis.
+			:param results: the results of the paragraphs, by paragraph key.
+			:type requester: GrammalecteRequester
+			:type optionsKey: tuple
+			:type results: dict
+		"""
+		self.__knownResults[requester] = (optionsKey, results)
+
+	def _get_known_paragraphs(self, requester):
+		"""
+			Get the paragraphs of the last text read from the requester.
+
+			:param requester: the requester.
+			:type requester: GrammalecteRequester
+			:return: the paragraphs, or None if unknown.
+			:rtype: list
+		"""
+		return self.__knownParagraphs.get(requester)
+
+	def _set_known_paragraphs(self, requester, paragraphs):
+		"""
+			Set the paragraphs of the last text read from the requester.
+
+			:param requester: the requester.
+			:param paragraphs: the paragraphs of the text.
+			:type requester: GrammalecteRequester
+			:type paragraphs: list
+		"""
+		self.__knownParagraphs[requester] = paragraphs
+
+	def _get_result_cache(self):
+		"""
+			Get the result cache, shared by all analyzers.
+
+			:return: the result cache.
+			:rtype: GResultCache
+		"""
+		return GrammalecteAnalyzer.__resultCache
+
+	def _get_disk_cache(self):
+		"""
+			Get the disk cache, shared by all analyzers.
+
+			:return: the disk cache, or None if not active.
+			:rtype: GDiskCache
+		"""
+		return GrammalecteAnalyzer.__diskCache
+
+	def _get_engine_version(self, config):
+		"""
+			Get an identifier of the Grammalecte version.
+
+			The identifier is built from the command line interface file, which
+			is replaced when Grammalecte is upgraded.
+
+			:param config: the configuration of the requester.
+			:type config: GrammalecteConfig
+			:return: the version identifier.
+			:rtype: str
+		"""
+		gramCli = config.get_value(GrammalecteConfig.GRAMMALECTE_CLI)
+		try:
+			stat = os.stat(gramCli)
+			return "{}:{}:{}".format(gramCli, stat.st_size, stat.st_mtime)
+		except OSError:
+			return gramCli
+
+	def __get_analyses(self):
+		"""
+			Get the running analyzis.
+
+			:return: the analyzis running in a slot.
+			:rtype: list
+		"""
+		analyses = [slot.state.get_analysis() for slot in self.__slots
+			if slot.state is not None]
+		return [analysis for analysis in analyses if analysis is not None]
+
+	def _get_busy_requesters(self):
+		"""
+			Get the requesters being analyzed.
+
+			:return: the requesters.
+			:rtype: set
+		"""
+		return set([analysis.requester for analysis in self.__get_analyses()])
+
+	def _get_free_slot_count(self):
+		"""
+			Get the count of slots in which no analyzis is running.
+
+			:return: the count of free slots.
+			:rtype: int
+		"""
+		return len(self.__slots) - len(self.__get_analyses())
+
+	def _take_shard(self):
+		"""
+			Take a shard waiting to be analyzed in a running analyzis.
+
+			:return: the shard, or None if there is no waiting shard.
+			:rtype: _Shard
+		"""
+		for analysis in self.__get_analyses():
+			shard = analysis.take_shard()
+			if shard is not None:
+				return shard
+		return None
+
+	def _is_worker_active(self, config):
+		"""
+			Indicate if the persistent workers should be used.
+
+			:param config: the configuration of the requester.
+			:type config: GrammalecteConfig
+			:return: True if analyzis must be made by workers.
+			:rtype: bool
+		"""
+		return config.get_value(GrammalecteConfig.GRAMMALECTE_WORKER_ACTIVE) \
+			and GrammalecteAnalyzer.__get_command(config) \
+			not in self.__disabledWorkers
+
+	def _disable_worker(self, config):
+		"""
+			Stop using the persistent workers for the command of the given
+			configuration.
+
+			All subsequent analyzis with this command will be made by
+			Grammalecte processes. Workers are used again if the command is
+			changed in the configuration.
+
+			:param config: the configuration of the failed worker.
+			:type config: GrammalecteConfig
+		"""
+		self.__disabledWorkers.add(GrammalecteAnalyzer.__get_command(config))
+		for slot in self.__slots:
+			slot.terminate_worker()
+
+	@staticmethod
+	def __get_command(config):
+		"""
+			Get the command used to run Grammalecte.
+
+			:param config: the configuration.
+			:type config: GrammalecteConfig
+			:return: the Python executable and the command line interface.
+			:rtype: tuple
+		"""
+		return (config.get_value(GrammalecteConfig.GRAMMALECTE_PYTHON_EXE),
+			config.get_value(GrammalecteConfig.GRAMMALECTE_CLI))
 
 	def terminate(self):
-		""" Terminate the analyzer, which will not be usable anymore """
-		self.__state = None
-		self._error.terminate()
-		self._output.terminate()
-		self._input.terminate()
+		"""
+			Terminate the analyzer, which will not be usable anymore.
+
+			If it was the shared analyzer, a new one will be given by the next
+			call to acquire.
+		"""
+		if GrammalecteAnalyzer.__sharedInstance is self:
+			GrammalecteAnalyzer.__sharedInstance = None
+			GrammalecteAnalyzer.__sharedCount = 0
+		if self.__wakeUpId is not None:
+			gobject.source_remove(self.__wakeUpId)
+			self.__wakeUpId = None
+		if self.__slots is not None:
+			for slot in self.__slots:
+				slot.terminate()
+		self.__slots = None
 		self._queue = None
 
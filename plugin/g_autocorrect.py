@@ -31,15 +31,18 @@
 # temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
 # <http://www.gnu.org/licenses>.
 
+import collections
 import gtk
 import gobject
 import pango
+import time
 
 from g_config import GrammalecteConfig
 
 from g_analyzer import GrammalecteRequester, GrammalecteAnalyzer
 from g_converter import GErrorConverter
 from g_error import GErrorDesc, GErrorStore
+from g_paragraph import get_line_starts, get_offset, GDirtyLines
 from g_popup import GPopupMenu
 
 class _BufferData:
@@ -47,13 +50,26 @@ class _BufferData:
 	__TAG_GRAMMAR = "grammalecte_grammar"
 	__TAG_SPELLING = "grammalecte_spelling"
 
-	def __init__(self, vBuffer, callback):
-		""" Initialize the buffer data """
+	def __init__(self, vBuffer, callback, editCallback):
+		"""
+			Initialize the buffer data.
+
+			The edit callback is called before each edit of the buffer, with
+			the start of the edit, the end of the replaced text and the end of
+			the new text. The changed lines are also tracked from the last
+			time the text was read.
+		"""
 		self.vBuffer = vBuffer
+		self.__editCallback = editCallback
+		self.__dirtyLines = None
 		if self.vBuffer is not None:
 			self.grammarTag, self.spellingTag = self.__init_tag(
 				[_BufferData.__TAG_GRAMMAR, _BufferData.__TAG_SPELLING])
 			self.__eventChangedId = self.vBuffer.connect("changed", callback)
+			self.__eventInsertId = self.vBuffer.connect(
+				"insert-text", self.on_insert_text)
+			self.__eventDeleteId = self.vBuffer.connect(
+				"delete-range", self.on_delete_range)
 
 	def __init_tag(self, tagNames):
 		""" Create error tags """
@@ -69,12 +85,55 @@ class _BufferData:
 	def terminate(self):
 		""" Terminate usage of this buffer data """
 		if self.vBuffer is not None:
+			self.vBuffer.disconnect(self.__eventDeleteId)
+			self.vBuffer.disconnect(self.__eventInsertId)
 			self.vBuffer.disconnect(self.__eventChangedId)
 			self.clear_tags([self.grammarTag, self.spellingTag])
 			self.spellingTag = None
 			self.grammarTag = None
 			self.vBuffer = None
 
+	def on_insert_text(self, vBuffer, location, text, length):
+		""" Manage the insert text event """
+		start = _BufferData.get_position(location)
+		lines = text.decode("utf-8").split("\n")
+		if len(lines) == 1:
+			newEnd = (start[0], start[1] + len(lines[0]))
+		else:
+			newEnd = (start[0] + len(lines) - 1, len(lines[-1]))
+		self.__edit(start, start, newEnd)
+
+	def on_delete_range(self, vBuffer, start, end):
+		""" Manage the delete range event """
+		start = _BufferData.get_position(start)
+		self.__edit(start, _BufferData.get_position(end), start)
+
+	def __edit(self, start, oldEnd, newEnd):
+		""" Register an edit of the buffer """
+		if self.__dirtyLines is not None:
+			self.__dirtyLines.edit(start[0], oldEnd[0], newEnd[0])
+		self.__editCallback(start, oldEnd, newEnd)
+
+	def reset_dirty_lines(self):
+		""" Start tracking the changed lines, when the text is read """
+		self.__dirtyLines = GDirtyLines()
+
+	def get_dirty_lines(self):
+		"""
+			Get the lines changed since the text was read.
+
+			:return: the ranges of changed lines, or None if the text was not
+				read yet.
+			:rtype: list
+		"""
+		return None if self.__dirtyLines is None else \
+			self.__dirtyLines.get_ranges()
+
+	@staticmethod
+	def get_position(iterator):
+		""" Get the position (line, offset) of the iterator """
+		return (iterator.get_line(), iterator.get_line_offset())
+
 	def clear_tags(self, tags):
 		""" Clear the tags from buffer """
 		for tag in tags:
@@ -87,6 +146,7 @@ class _BufferData:
 class GrammalecteAutoCorrector(GrammalecteRequester):
 	""" The automatic corrector """
 	__TICK_DURATION = 100
+	__BATCH_DELAY = 0.005
 	__TOOLTIP = "{1}<span foreground=\"red\" style=\"italic\">{2}</span>{3}" \
 		+ "\n<span foreground=\"blue\" weight=\"bold\">{0}</span>"
 
@@ -94,11 +154,23 @@ class GrammalecteAutoCorrector(GrammalecteRequester):
 		""" Initialize the corrector """
 		self.__viewHelper = viewHelper
 		self.__requested = False
+		self.__generation = 0
 		self.__curBuffer = None
 		self.__store = GErrorStore()
+		self.__edits = []
+		self.__snapshot = None
+		self.__lineStarts = None
+		self.__underlined = set()
+		self.__removals = GErrorStore()
+		self.__toRemove = collections.deque()
+		self.__toUnderline = collections.deque()
+		self.__visibleLines = None
+		self.__underlineId = None
 		analyzer = self.__viewHelper.get_analyzer()
 		self.__eventAnalStartId = analyzer.connect(
 			"analyze-started", self.on_analyze_started)
+		self.__eventAnalProgressId = analyzer.connect(
+			"analyze-progress", self.on_analyze_progress)
 		self.__eventAnalFinishId = analyzer.connect(
 			"analyze-finished", self.on_analyze_finished)
 		view = self.__viewHelper.get_view()
@@ -111,24 +183,29 @@ class GrammalecteAutoCorrector(GrammalecteRequester):
 		self.__eventPopupMenu = view.connect("popup-menu", self.on_popup_menu)
 		self.__eventPopulatePopup = view.connect(
 			"populate-popup", self.on_populate_popup)
+		self.__eventExposeId = view.connect(
+			"expose-event", self.on_view_exposed)
 		self.__bufferData = _BufferData(
-			view.get_buffer(), self.on_content_changed)
+			view.get_buffer(), self.on_content_changed, self.on_buffer_edit)
 		self.__eventBufferId = view.connect(
 			"notify::buffer", self.on_buffer_changed)
 		self.__eventConfigUpdated = self.get_config().connect(
 			"updated", self.on_conf_updated)
 		self.__eventConfigCleared = self.get_config().connect(
 			"cleared", self.on_conf_cleared)
-		self.__tick_count = 1
+		self.__requestTimerId = None
 		self.__ask_request()
-		gobject.timeout_add(
-			GrammalecteAutoCorrector.__TICK_DURATION, self.__add_request)
 
 	def deactivate(self):
 		""" Disconnect the corrector from the view """
+		if self.__requestTimerId is not None:
+			gobject.source_remove(self.__requestTimerId)
+			self.__requestTimerId = None
 		self.get_config().disconnect(self.__eventConfigUpdated)
 		self.get_config().disconnect(self.__eventConfigCleared)
+		self.__cancel_underlines()
 		view = self.__viewHelper.get_view()
+		view.disconnect(self.__eventExposeId)
 		view.disconnect(self.__eventBufferId)
 		self.__bufferData.terminate()
 		self.__bufferData = None
@@ -139,8 +216,10 @@ class GrammalecteAutoCorrector(GrammalecteRequester):
 		view.disconnect(self.__eventTooltipId)
 		analyzer = self.__viewHelper.get_analyzer()
 		analyzer.disconnect(self.__eventAnalFinishId)
+		analyzer.disconnect(self.__eventAnalProgressId)
 		analyzer.disconnect(self.__eventAnalStartId)
 		self.__store = None
+		self.__underlined = None
 		self.__curBuffer = None
 		self.__viewHelper = None
 
@@ -150,28 +229,185 @@ class GrammalecteAutoCorrector(GrammalecteRequester):
 			return
 		self.__requested = False
 
+	def on_analyze_progress(self, analyzer, requester, result):
+		""" Set the partial result of the request """
+		if requester is not self or \
+			self.__curBuffer is not self.get_buffer():
+			return
+		self.__apply_result(result, False)
+
 	def on_analyze_finished(self, analyzer, requester, result):
 		""" Set the result of the request """
-		if requester is not self or \
+		if requester is not self or result is None or \
 			self.__curBuffer is not self.get_buffer():
 			return
-		self.__bufferData.clear_tags(
-			[self.__bufferData.grammarTag, self.__bufferData.spellingTag])
-		self.__store = GErrorConverter(self.get_config()).convert(result)
-		for error in self.__store:
-			start, end = self.convert_limits(error, self.__curBuffer)
-			tag = self.__bufferData.spellingTag if error[GErrorDesc.OPTION] \
-				== GrammalecteConfig.GRAMMALECTE_OPTION_SPELLING \
-				else self.__bufferData.grammarTag
-			self.__curBuffer.apply_tag(tag, start, end)
+		self.__apply_result(result, True)
 		self.__curBuffer = None
 
+	def __apply_result(self, result, complete):
+		"""
+			Underline the errors of the result.
+
+			Only the underlines of the errors which were added or removed since
+			the previous result are changed. Errors are identified by their
+			limits and their option. If only visible errors must be underlined,
+			the underlined errors of the previous result which are still found
+			are kept, even if not visible anymore.
+
+			Underlines are changed in small batches, when the main loop is
+			idle. The batches which did not run yet when a new result is
+			received are replaced by the ones of the new result.
+
+			Unused ignored errors are only forgotten when the result is
+			complete, as a partial result lacks the paragraphs not analyzed
+			yet.
+		"""
+		store = GErrorConverter(self.get_config()).convert(result, complete)
+		for edit in self.__edits:
+			store.edit(*edit)
+		newErrors = dict([
+			(GrammalecteAutoCorrector.__get_underline(store, error), error)
+			for error in self.__get_wanted_errors(store)])
+		pending = set(self.__toUnderline)
+		tagged = set([
+			GrammalecteAutoCorrector.__get_underline(self.__store, error)
+			for error in self.__underlined if error not in pending])
+		tagged.update([
+			GrammalecteAutoCorrector.__get_underline(self.__removals, record)
+			for record in self.__toRemove])
+		removed = []
+		for key in tagged:
+			if key in newErrors:
+				continue
+			kept = GrammalecteAutoCorrector.__find_underline(store, key)
+			if kept is None:
+				removed.append({GErrorDesc.START: key[0],
+					GErrorDesc.END: key[1], GErrorDesc.OPTION: key[2]})
+			else:
+				newErrors[key] = kept
+		self.__store = store
+		self.__underlined = set(newErrors.values())
+		self.__removals = GErrorStore(removed)
+		self.__toRemove = collections.deque(self.__removals)
+		self.__toUnderline = collections.deque([error for key, error
+			in sorted(newErrors.items()) if key not in tagged])
+		self.__schedule_underlines()
+
+	def __get_wanted_errors(self, store):
+		""" Get the errors of the store which must be underlined """
+		config = self.get_config()
+		lines = self.get_visible_lines()
+		if not config.get_value(GrammalecteConfig.UNDERLINE_VISIBLE_ONLY) or \
+			lines is None:
+			return list(store)
+		margin = config.get_value(GrammalecteConfig.UNDERLINE_MARGIN)
+		return store.get_range(max(0, lines[0] - margin), lines[1] + margin)
+
+	def on_view_exposed(self, view, event):
+		""" Manage the expose event, underline errors if view scrolled """
+		lines = self.get_visible_lines()
+		if lines != self.__visibleLines:
+			self.__visibleLines = lines
+			for error in self.__get_wanted_errors(self.__store):
+				if error not in self.__underlined:
+					self.__underlined.add(error)
+					self.__toUnderline.append(error)
+			self.__schedule_underlines()
+		return False
+
+	def __schedule_underlines(self):
+		""" Run the underline batches when main loop is idle, if needed """
+		if self.__underlineId is None and \
+			(len(self.__toRemove) > 0 or len(self.__toUnderline) > 0):
+			self.__underlineId = gobject.idle_add(self.__run_underlines)
+
+	def __cancel_underlines(self):
+		""" Forget the underlines not changed yet """
+		if self.__underlineId is not None:
+			gobject.source_remove(self.__underlineId)
+			self.__underlineId = None
+		self.__removals = GErrorStore()
+		self.__toRemove = collections.deque()
+		self.__toUnderline = collections.deque()
+
+	def __run_underlines(self):
+		""" Change the underlines until the batch delay expires """
+		deadline = time.time() + GrammalecteAutoCorrector.__BATCH_DELAY
+		while time.time() < deadline:
+			if len(self.__toRemove) > 0:
+				self.__remove_underline(self.__toRemove.popleft())
+			elif len(self.__toUnderline) > 0:
+				self.__underline_error(self.__toUnderline.popleft())
+			else:
+				self.__underlineId = None
+				return False
+		return True
+
+	def __remove_underline(self, record):
+		"""
+			Remove an underline.
+
+			The underline is also removed from the overlapping errors, which
+			are then underlined again.
+		"""
+		start, end, option = \
+			GrammalecteAutoCorrector.__get_underline(self.__removals, record)
+		vBuffer = self.get_buffer()
+		vBuffer.remove_tag(self.__get_tag(option),
+			*self.__convert_positions((start, end), vBuffer))
+		for error in self.__store.search_range(start, end):
+			if error in self.__underlined:
+				self.__underline_error(error)
+
+	@staticmethod
+	def __get_underline(store, error):
+		""" Get the identifier of the underline of the error """
+		start, end = store.get_limits(error)
+		return (start, end, error[GErrorDesc.OPTION])
+
+	@staticmethod
+	def __find_underline(store, key):
+		""" Find the error of the store having the given underline """
+		for error in store.search_range(key[0], key[1]):
+			if GrammalecteAutoCorrector.__get_underline(store, error) == key:
+				return error
+		return None
+
+	def __underline_error(self, error):
+		""" Underline the error of the store """
+		start, end, option = \
+			GrammalecteAutoCorrector.__get_underline(self.__store, error)
+		vBuffer = self.get_buffer()
+		vBuffer.apply_tag(self.__get_tag(option),
+			*self.__convert_positions((start, end), vBuffer))
+
+	def __get_tag(self, option):
+		""" Get the tag used to underline an error of the option """
+		return self.__bufferData.spellingTag \
+			if option == GrammalecteConfig.GRAMMALECTE_OPTION_SPELLING \
+			else self.__bufferData.grammarTag
+
 	def convert_limits(self, error, vBuffer):
 		""" Convert the limits from error to iterator """
+		return self.__convert_positions(
+			self.__store.get_limits(error), vBuffer)
+
+	def __convert_positions(self, positions, vBuffer):
+		"""
+			Convert the positions (line, offset) to iterators.
+
+			While the buffer is the one of the last analyzed text and was not
+			edited since, positions are converted with the line starts of this
+			text, which only needs one call to the buffer for each position.
+		"""
+		lineStarts = self.__get_line_starts(vBuffer)
+		if lineStarts is not None:
+			return [vBuffer.get_iter_at_offset(
+				get_offset(lineStarts, line, offset))
+				for line, offset in positions]
 		limits = []
 		maxLine = vBuffer.get_end_iter().get_line()
-		for limitDesc in [GErrorDesc.START, GErrorDesc.END]:
-			line, offset = error[limitDesc]
+		for line, offset in positions:
 			if line > maxLine:
 				line = maxLine
 			iterator = vBuffer.get_iter_at_line(line)
@@ -181,6 +417,21 @@ class GrammalecteAutoCorrector(GrammalecteRequester):
 			limits.append(iterator)
 		return limits
 
+	def __get_line_starts(self, vBuffer):
+		"""
+			Get the line starts of the buffer, built from the last analyzed text
+			when first needed.
+
+			:return: the line starts, or None if they are not known.
+			:rtype: list
+		"""
+		if vBuffer is not self.get_buffer():
+			return None
+		if self.__lineStarts is None and self.__snapshot is not None:
+			self.__lineStarts = get_line_starts(self.__snapshot.decode("utf-8"))
+			self.__snapshot = None
+		return self.__lineStarts
+
 	def on_query_tooltip(self, view, x, y, keyboard, tooltip):
 		""" Manage tooltip query event """
 		if keyboard:
@@ -191,10 +442,12 @@ class GrammalecteAutoCorrector(GrammalecteRequester):
 			pos = view.get_iter_at_location(*buffPos)
 		line = pos.get_line()
 		offset = pos.get_line_offset()
-		error = self.__store.search((line, offset))
-		if error is not None:
-			tooltip.set_markup(GrammalecteAutoCorrector.__TOOLTIP.format(
-				error[GErrorDesc.DESCRIPTION], *error[GErrorDesc.CONTEXT]))
+		errors = self.__store.search_all((line, offset))
+		if len(errors) > 0:
+			tooltip.set_markup("\n\n".join([
+				GrammalecteAutoCorrector.__TOOLTIP.format(
+				error[GErrorDesc.DESCRIPTION], *error[GErrorDesc.CONTEXT])
+				for error in errors]))
 			return True
 		else:
 			return False
@@ -217,26 +470,46 @@ class GrammalecteAutoCorrector(GrammalecteRequester):
 		""" Manage the populate popup event """
 		line = self.__menuPosition.get_line()
 		offset = self.__menuPosition.get_line_offset()
-		error = self.__store.search((line, offset))
-		if error is not None:
-			GPopupMenu(menu, error, self)
+		errors = self.__store.search_all((line, offset))
+		if len(errors) > 0:
+			GPopupMenu(menu, errors, self)
 
 	def on_content_changed(self, *ignored):
 		""" Called when buffer content changed """
 		self.__ask_request()
 
+	def on_buffer_edit(self, start, oldEnd, newEnd):
+		"""
+			Called before an edit of the buffer content.
+
+			The edit is logged in the error store, so that errors stay at the
+			right place until next analyzis, and kept for the result of the
+			analyzis in progress, which was made on the text before the edit.
+		"""
+		self.__store.edit(start, oldEnd, newEnd)
+		self.__removals.edit(start, oldEnd, newEnd)
+		self.__edits.append((start, oldEnd, newEnd))
+		self.__snapshot = None
+		self.__lineStarts = None
+
 	def on_buffer_changed(self, *ignored):
 		""" Called when the buffer was changed """
 		self.__bufferData.terminate()
+		self.__cancel_underlines()
+		self.__store = GErrorStore()
+		self.__edits = []
+		self.__snapshot = None
+		self.__lineStarts = None
+		self.__underlined = set()
 		self.__bufferData = _BufferData(
-			self.__viewHelper.get_view().get_buffer(), self.on_content_changed)
+			self.__viewHelper.get_view().get_buffer(), self.on_content_changed,
+			self.on_buffer_edit)
 		self.__ask_request()
 
 	def on_conf_updated(self, config, level, xPath, *ignored):
 		""" Manage the configuration updated event """
 		if xPath in (
 			GrammalecteConfig.AUTO_ANALYZE_ACTIVE,
-			GrammalecteConfig.AUTO_ANALYZE_TIMER,
 			GrammalecteConfig.GRAMMALECTE_OPTIONS_PARAMS,
 			GrammalecteConfig.GRAMMALECTE_OPTIONS_REGEX):
 			return
@@ -247,36 +520,107 @@ class GrammalecteAutoCorrector(GrammalecteRequester):
 		self.__ask_request()
 
 	def __ask_request(self):
-		""" Called when request is needed """
-		if not self.__requested:
-			self.__tick_count = self.get_config().get_value(
-				GrammalecteConfig.ANALYZE_WAIT_TICKS)
+		""" Called when request is needed, (re)start the wait timer """
+		self.__generation += 1
+		if self.__requested:
+			return
+		if self.__requestTimerId is not None:
+			gobject.source_remove(self.__requestTimerId)
+		self.__requestTimerId = gobject.timeout_add(
+			GrammalecteAutoCorrector.__TICK_DURATION * self.get_config()
+			.get_value(GrammalecteConfig.ANALYZE_WAIT_TICKS),
+			self.__add_request)
 
 	def __add_request(self):
-		""" If idle time is enough, execute the request """
-		if self.__store is None:
-			return False
-		if self.__tick_count >= 0:
-			self.__tick_count -= 1
-		if self.__tick_count == 0:
-			self.__requested = True
-			self.__viewHelper.get_analyzer().add_request(self)
-		return True
+		""" Idle time is enough, execute the request """
+		self.__requestTimerId = None
+		self.__requested = True
+		self.__viewHelper.get_analyzer().add_request(self)
+		return False
 
 	def get_config(self):
 		""" Get the configuration for the requester """
 		return None if self.__viewHelper is None else \
 			self.__viewHelper.get_config()
 
+	def get_generation(self):
+		""" Get the generation of the requester content """
+		return self.__generation
+
+	def get_priority(self):
+		""" Get the priority of the requester """
+		return GrammalecteRequester.PRIORITY_BACKGROUND \
+			if self.__viewHelper is None else self.__viewHelper.get_priority()
+
+	def get_client(self):
+		""" Get the client the requester belongs to """
+		return None if self.__viewHelper is None else \
+			self.__viewHelper.get_client()
+
+	def get_cursor_line(self):
+		""" Get the line where the cursor is """
+		vBuffer = None if self.__bufferData is None else self.get_buffer()
+		if vBuffer is None:
+			return None
+		return vBuffer.get_iter_at_mark(vBuffer.get_insert()).get_line()
+
+	def get_visible_lines(self):
+		""" Get the lines visible in the view """
+		if self.__viewHelper is None:
+			return None
+		view = self.__viewHelper.get_view()
+		rect = view.get_visible_rect()
+		return (view.get_line_at_y(rect.y)[0].get_line(),
+			view.get_line_at_y(rect.y + rect.height)[0].get_line())
+
 	def get_text(self):
 		""" Get the text of the requester """
 		if self.__bufferData is None:
 			return ""
 		self.__curBuffer = self.get_buffer()
-		return self.__curBuffer.get_slice(
+		self.__edits = []
+		self.__snapshot = self.__curBuffer.get_slice(
 			self.__curBuffer.get_start_iter(), self.__curBuffer.get_end_iter())
+		self.__lineStarts = None
+		self.__bufferData.reset_dirty_lines()
+		return self.__snapshot
+
+	def get_dirty_lines(self):
+		""" Get the lines changed since the text was last read """
+		return None if self.__bufferData is None else \
+			self.__bufferData.get_dirty_lines()
 
 	def get_buffer(self):
 		""" Get the current buffer """
 		return self.__bufferData.vBuffer
 
+	def goto_next_error(self):
+		"""
+			Select the first error after the cursor.
+
+			:return: True if an error was selected, False otherwise.
+			:rtype: bool
+		"""
+		return self.__goto_error(self.__store.next_error)
+
+	def goto_previous_error(self):
+		"""
+			Select the last error before the cursor.
+
+			:return: True if an error was selected, False otherwise.
+			:rtype: bool
+		"""
+		return self.__goto_error(self.__store.previous_error)
+
+	def __goto_error(self, find):
+		""" Select the error found from the cursor position """
+		vBuffer = self.get_buffer()
+		cursor = vBuffer.get_iter_at_mark(vBuffer.get_insert())
+		error = find((cursor.get_line(), cursor.get_line_offset()))
+		if error is None:
+			return False
+		start, end = self.convert_limits(error, vBuffer)
+		vBuffer.select_range(start, end)
+		self.__viewHelper.get_view().scroll_mark_onscreen(vBuffer.get_insert())
+		return True
+
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of pluma-grammalecte.
+#
+# pluma-grammalecte is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# pluma-grammalecte is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# pluma-grammalecte. If not, see <http://www.gnu.org/licenses/>.
+#
+# Ce fichier fait partie de pluma-grammalecte.
+#
+# pluma-grammalecte est un logiciel libre ; vous pouvez le redistribuer ou le
+# modifier suivant les termes de la GNU General Public License telle que
+# publiée par la Free Software Foundation ; soit la version 3 de la licence,
+# soit (à votre gré) toute version ultérieure.
+#
+# pluma-grammalecte est distribué dans l'espoir qu'il sera utile, mais SANS
+# AUCUNE GARANTIE ; sans même la garantie tacite de QUALITÉ MARCHANDE ou
+# d'ADÉQUATION à UN BUT PARTICULIER. Consultez la GNU General Public License
+# pour plus de détails.
+#
+# Vous devez avoir reçu une copie de la GNU General Public License en même
+# temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
+# <http://www.gnu.org/licenses>.
+
+
+"""
+	Manage the cache of the analyzis results.
+
+	The memory cache keeps the results of the most recently used paragraphs, so
+	that an already analyzed paragraph is never sent to Grammalecte again,
+	whatever the document it comes from. The disk cache keeps the results
+	between sessions.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+from collections import OrderedDict
+
+class GResultCache:
+	"""
+		A least recently used cache of paragraph results.
+
+		The cache is bounded both by its count of entries and by an estimation
+		of the memory used by the results. When a bound is exceeded, the least
+		recently used entries are evicted.
+
+		:Example:
+
+		>>> cache = GResultCache(2, 4096)
+		>>> cache.put("a", {"lGrammarErrors": [], "lSpellingErrors": []})
+		>>> cache.put("b", {"lGrammarErrors": [], "lSpellingErrors": []})
+		>>> cache.get("a") is not None
+		True
+		>>> cache.put("c", {"lGrammarErrors": [], "lSpellingErrors": []})
+		>>> len(cache)
+		2
+		>>> cache.get("b") is None
+		True
+	"""
+	__ENTRY_SIZE = 128
+	__ERROR_SIZE = 256
+
+	def __init__(self, maxEntries, maxSize):
+		"""
+			Create the cache.
+
+			:param maxEntries: the maximum count of entries.
+			:param maxSize: the maximum estimated size of the results, in bytes.
+			:type maxEntries: int
+			:type maxSize: int
+		"""
+		self.__maxEntries = maxEntries
+		self.__maxSize = maxSize
+		self.__entries = OrderedDict()
+		self.__size = 0
+
+	def __len__(self):
+		"""
+			Return the count of entries in the cache.
+
+			:return: the count of entries.
+			:rtype: int
+		"""
+		return len(self.__entries)
+
+	def get_size(self):
+		"""
+			Get the estimated size of the results in the cache.
+
+			:return: the size, in bytes.
+			:rtype: int
+		"""
+		return self.__size
+
+	def get(self, key):
+		"""
+			Get the result associated to the key.
+
+			The entry becomes the most recently used.
+
+			:param key: the key of the entry.
+			:type key: any
+			:return: the result, or None if not in cache.
+			:rtype: dict
+		"""
+		entry = self.__entries.pop(key, None)
+		if entry is None:
+			return None
+		self.__entries[key] = entry
+		return entry[0]
+
+	def put(self, key, result):
+		"""
+			Put a result in the cache.
+
+			:param key: the key of the entry.
+			:param result: the paragraph result.
+			:type key: any
+			:type result: dict
+		"""
+		old = self.__entries.pop(key, None)
+		if old is not None:
+			self.__size -= old[1]
+		size = GResultCache.__estimate_size(result)
+		self.__entries[key] = (result, size)
+		self.__size += size
+		while len(self.__entries) > self.__maxEntries or \
+			(self.__size > self.__maxSize and len(self.__entries) > 1):
+			evicted = self.__entries.popitem(False)[1]
+			self.__size -= evicted[1]
+
+	def clear(self):
+		""" Remove all entries from the cache """
+		self.__entries.clear()
+		self.__size = 0
+
+	@staticmethod
+	def __estimate_size(result):
+		"""
+			Estimate the memory used by a result.
+
+			:param result: the paragraph result.
+			:type result: dict
+			:return: the estimated size, in bytes.
+			:rtype: int
+		"""
+		errorCount = 0
+		for errors in result.itervalues():
+			errorCount += len(errors)
+		return GResultCache.__ENTRY_SIZE + \
+			errorCount * GResultCache.__ERROR_SIZE
+
+class GDiskCache:
+	"""
+		A cache of paragraph results stored in an SQLite database.
+
+		The database can be used by several processes at the same time. It is
+		bounded by the size of the stored results, which is kept up to date in
+		the database. When the bound is exceeded, the least recently used
+		entries are evicted. If the database is locked by another process, the
+		request is given up, as if the entries were not found. If the database
+		cannot be used, the cache is disabled and behaves as if it was empty.
+
+		:Example:
+
+		>>> cache = GDiskCache(":memory:", 4096)
+		>>> cache.put_all({"a": {"lGrammarErrors": [], "lSpellingErrors": []}})
+		>>> cache.get_all(["a", "b"]).keys()
+		[u'a']
+	"""
+	__TIMEOUT = 0.2
+	__MAX_VARIABLES = 500
+	__EVICTION_RATIO = 0.8
+
+	def __init__(self, filename, maxSize):
+		"""
+			Open the cache.
+
+			:param filename: the full name of the database file.
+			:param maxSize: the maximum size of the results, in bytes.
+			:type filename: str
+			:type maxSize: int
+		"""
+		self.__maxSize = maxSize
+		self.__connection = None
+		try:
+			directory = os.path.dirname(filename)
+			if directory != "" and not os.path.isdir(directory):
+				os.makedirs(directory)
+			self.__connection = sqlite3.connect(
+				filename, timeout = GDiskCache.__TIMEOUT)
+			self.__connection.execute("PRAGMA journal_mode=WAL")
+			with self.__connection:
+				self.__connection.execute("CREATE TABLE IF NOT EXISTS results" \
+					" (key TEXT PRIMARY KEY, result TEXT NOT NULL," \
+					" size INTEGER NOT NULL, used REAL NOT NULL)")
+				self.__connection.execute("CREATE INDEX IF NOT EXISTS" \
+					" results_used ON results (used)")
+				self.__connection.execute("CREATE TABLE IF NOT EXISTS meta" \
+					" (name TEXT PRIMARY KEY, value REAL NOT NULL)")
+				self.__connection.execute("INSERT OR IGNORE INTO meta" \
+					" SELECT 'size', TOTAL(size) FROM results")
+		except (sqlite3.Error, OSError) as e:
+			self.__fail(e)
+
+	def get_size(self):
+		"""
+			Get the size of the results in the cache.
+
+			:return: the size, in bytes.
+			:rtype: int
+		"""
+		if self.__connection is None:
+			return 0
+		try:
+			return int(self.__get_size())
+		except sqlite3.Error as e:
+			self.__fail(e)
+			return 0
+
+	def __get_size(self):
+		""" Read the size of the results from the database """
+		return self.__connection.execute(
+			"SELECT value FROM meta WHERE name = 'size'").fetchone()[0]
+
+	def get_all(self, keys):
+		"""
+			Get the results associated to the keys.
+
+			The found entries become the most recently used.
+
+			:param keys: the keys of the entries.
+			:type keys: list
+			:return: the found results, by key.
+			:rtype: dict
+		"""
+		results = {}
+		if self.__connection is None:
+			return results
+		try:
+			with self.__connection:
+				for chunk in GDiskCache.__chunks(keys):
+					marks = ",".join("?" * len(chunk))
+					for key, result in self.__connection.execute(
+						"SELECT key, result FROM results WHERE key IN (" +
+						marks + ")", chunk):
+						results[key] = json.loads(result)
+					self.__connection.execute("UPDATE results SET used = ?" \
+						" WHERE key IN (" + marks + ")", [time.time()] + chunk)
+		except sqlite3.Error as e:
+			self.__fail(e)
+			return {}
+		return results
+
+	def put_all(self, results):
+		"""
+			Put results in the cache.
+
+			Results are supposed not to change for a given key, so existing
+			entries are kept as is.
+
+			:param results: the paragraph results, by key.
+			:type results: dict
+		"""
+		if self.__connection is None or len(results) == 0:
+			return
+		try:
+			with self.__connection:
+				now = time.time()
+				added = 0
+				for key, result in results.iteritems():
+					value = json.dumps(result, separators = (",", ":"))
+					if self.__connection.execute("INSERT OR IGNORE INTO" \
+						" results VALUES (?, ?, ?, ?)",
+						(key, value, len(value), now)).rowcount > 0:
+						added += len(value)
+				self.__connection.execute("UPDATE meta SET value = value + ?" \
+					" WHERE name = 'size'", (added,))
+				self.__evict()
+		except sqlite3.Error as e:
+			self.__fail(e)
+
+	def __evict(self):
+		"""
+			Evict the least recently used entries if the cache is too big.
+
+			Entries are evicted until the cache uses only a part of its maximum
+			size, in order not to evict again at each insertion. The size is
+			then computed again from the entries.
+		"""
+		size = self.__get_size()
+		if size <= self.__maxSize:
+			return
+		target = size - self.__maxSize * GDiskCache.__EVICTION_RATIO
+		evicted = []
+		for key, keySize in self.__connection.execute(
+			"SELECT key, size FROM results ORDER BY used"):
+			if target <= 0:
+				break
+			evicted.append(key)
+			target -= keySize
+		for chunk in GDiskCache.__chunks(evicted):
+			self.__connection.execute("DELETE FROM results WHERE key IN (" +
+				",".join("?" * len(chunk)) + ")", chunk)
+		self.__connection.execute("UPDATE meta SET value =" \
+			" (SELECT TOTAL(size) FROM results) WHERE name = 'size'")
+
+	def close(self):
+		""" Close the cache, which will not be usable anymore """
+		if self.__connection is not None:
+			self.__connection.close()
+			self.__connection = None
+
+	def __fail(self, error):
+		"""
+			Manage an error of the database.
+
+			The cache is disabled, unless the database was only locked by
+			another process.
+
+			:param error: the error.
+			:type error: Exception
+		"""
+		if isinstance(error, sqlite3.OperationalError) and \
+			"locked" in str(error):
+			return
+		self.__disable(error)
+
+	def __disable(self, error):
+		"""
+			Disable the cache after an error.
+
+			:param error: the error.
+			:type error: Exception
+		"""
+		print _("Error: disk cache disabled: {}").format(error)
+		self.close()
+
+	@staticmethod
+	def __chunks(keys):
+		"""
+			Split the keys in chunks small enough for SQLite requests.
+
+			:param keys: the keys to split.
+			:type keys: list
+			:return: a generator of lists of keys.
+			:rtype: generator
+		"""
+		keys = list(keys)
+		for index in range(0, len(keys), GDiskCache.__MAX_VARIABLES):
+			yield keys[index:index + GDiskCache.__MAX_VARIABLES]
+
+if __name__ == "__main__":
+	import doctest
+	doctest.testmod()
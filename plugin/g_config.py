@@ -40,6 +40,7 @@
 import glib
 import gobject
 import json
+import multiprocessing
 import os
 
 class SelfConfigContainer:
@@ -480,8 +481,8 @@ class GrammalecteConfig(DictConfig):
 
 		>>> config = GrammalecteConfig()
 
-		>>> config.get_value(GrammalecteConfig.AUTO_ANALYZE_TIMER)
-		500
+		>>> config.get_value(GrammalecteConfig.ANALYZE_WAIT_TICKS)
+		12
 
 		>>> config.set_value("top/sub", ["zero", {"1st": "1", "other": "yes"}])
 
@@ -495,12 +496,22 @@ class GrammalecteConfig(DictConfig):
 	LOCALE_DIR = "locale-dir"
 	ANALYZE_OPTIONS = "analyze-options"
 	AUTO_ANALYZE_ACTIVE = "auto-analyze-active"
-	AUTO_ANALYZE_TIMER = "auto-analyze-timer"
 	ANALYZE_WAIT_TICKS = "analyze-wait-ticks"
+	ANALYZE_PARALLEL_COUNT = "analyze-parallel-count"
+	ANALYZE_SHARD_SIZE = "analyze-shard-size"
+	UNDERLINE_VISIBLE_ONLY = "underline-visible-only"
+	UNDERLINE_MARGIN = "underline-margin"
 	IGNORED_RULES = "ign-rules"
 	IGNORED_ERRORS = "ign-errors"
+	CACHE_MAX_ENTRIES = "cache-max-entries"
+	CACHE_MAX_SIZE = "cache-max-size"
+	DISK_CACHE_ACTIVE = "disk-cache-active"
+	DISK_CACHE_FILE = "disk-cache-file"
+	DISK_CACHE_MAX_SIZE = "disk-cache-max-size"
 	GRAMMALECTE_PYTHON_EXE = "g-python-exe"
 	GRAMMALECTE_CLI = "g-cli"
+	GRAMMALECTE_WORKER_ACTIVE = "g-worker-active"
+	GRAMMALECTE_DAEMON_ACTIVE = "g-daemon-active"
 	GRAMMALECTE_ANALYZE_PARAMS = "g-analyze-params"
 	GRAMMALECTE_OPTIONS_PARAMS = "g-options-params"
 	GRAMMALECTE_OPTIONS_REGEX = "g-options-regex"
@@ -517,15 +528,28 @@ class GrammalecteConfig(DictConfig):
 
 	GRAMMALECTE_OPTION_SPELLING = "_orth_"
 
+	__USER_CACHE_FILE = glib.get_user_cache_dir() + \
+		"/pluma/grammalecte-cache.sqlite"
+
 	__DEFAULT_CONFIG = {
 		ANALYZE_OPTIONS: {},
 		AUTO_ANALYZE_ACTIVE: False,
-		AUTO_ANALYZE_TIMER: 500,
 		ANALYZE_WAIT_TICKS: 12,
+		ANALYZE_PARALLEL_COUNT: multiprocessing.cpu_count(),
+		ANALYZE_SHARD_SIZE: 64,
+		UNDERLINE_VISIBLE_ONLY: True,
+		UNDERLINE_MARGIN: 100,
 		IGNORED_RULES: [],
 		IGNORED_ERRORS: [],
+		CACHE_MAX_ENTRIES: 20000,
+		CACHE_MAX_SIZE: 32768,
+		DISK_CACHE_ACTIVE: True,
+		DISK_CACHE_FILE: __USER_CACHE_FILE,
+		DISK_CACHE_MAX_SIZE: 65536,
 		GRAMMALECTE_PYTHON_EXE: "python3",
 		GRAMMALECTE_CLI: "/opt/grammalecte/cli.py",
+		GRAMMALECTE_WORKER_ACTIVE: True,
+		GRAMMALECTE_DAEMON_ACTIVE: False,
 		__CLI_PARAMS: {
 			__CLI_FILE: "-f",
 			__CLI_OPTS_ON: "-on",
@@ -31,7 +31,9 @@
 # temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
 # <http://www.gnu.org/licenses>.
 
+import gobject
 import gtk
+import os
 import pluma
 import re
 import subprocess
@@ -39,6 +41,89 @@ import subprocess
 from g_config import GrammalecteConfig
 from g_view import GrammalecteViewHelper
 
+class _OptionsFetch:
+	"""
+		A call to Grammalecte to get the available options.
+
+		The call is made in background, and its result is kept, so that the
+		dialog box does not have to wait for Grammalecte when it is opened.
+	"""
+	__CHUNK_SIZE = 65536
+	__fetches = {}
+
+	@staticmethod
+	def start(processArgs):
+		"""
+			Start the call in background, if not already done.
+
+			:param processArgs: the arguments of the Grammalecte process.
+			:type processArgs: list
+		"""
+		key = tuple(processArgs)
+		if key not in _OptionsFetch.__fetches:
+			_OptionsFetch.__fetches[key] = _OptionsFetch(processArgs)
+
+	@staticmethod
+	def get(processArgs):
+		"""
+			Get the result of the call, waiting for its end if needed.
+
+			A failed call is not kept, so that it is made again next time.
+
+			:param processArgs: the arguments of the Grammalecte process.
+			:type processArgs: list
+			:return: the raw options given by Grammalecte.
+			:rtype: str
+		"""
+		key = tuple(processArgs)
+		fetch = _OptionsFetch.__fetches.get(key)
+		if fetch is None:
+			fetch = _OptionsFetch(processArgs)
+		_OptionsFetch.__fetches[key] = fetch
+		rawOptions, failed = fetch.__wait()
+		if failed:
+			del _OptionsFetch.__fetches[key]
+		return rawOptions
+
+	def __init__(self, processArgs):
+		""" Start the Grammalecte process """
+		self.__process = subprocess.Popen(
+			processArgs, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
+		self.__chunks = []
+		self.__result = None
+		self.__watchId = gobject.io_add_watch(self.__process.stdout,
+			gobject.IO_IN | gobject.IO_HUP | gobject.IO_ERR, self.on_readable)
+
+	def on_readable(self, source, condition):
+		""" Manage the data available event """
+		data = os.read(self.__process.stdout.fileno(),
+			_OptionsFetch.__CHUNK_SIZE)
+		if len(data) > 0:
+			self.__chunks.append(data)
+			return True
+		self.__watchId = None
+		self.__finish()
+		return False
+
+	def __finish(self):
+		""" Wait for the end of the process and keep its result """
+		processError = self.__process.stderr.read()
+		self.__process.wait()
+		failed = self.__process.returncode != 0
+		if failed:
+			print _("Error: Grammalecte process did not terminate" \
+				" properly:\n{}").format(processError)
+		self.__result = ("".join(self.__chunks), failed)
+
+	def __wait(self):
+		""" Get the result, waiting for the end of the process if needed """
+		if self.__result is None:
+			gobject.source_remove(self.__watchId)
+			self.__watchId = None
+			self.__chunks.append(self.__process.stdout.read())
+			self.__finish()
+		return self.__result
+
 class GrammalecteConfigDlg:
 	""" The configuration dialog """
 	__RESPONSE_CLEAR = 1
@@ -113,10 +198,8 @@ class GrammalecteConfigDlg:
 		waitDlg.show()
 		self.__flush_events()
 
-		self.__set_options(self.__call_grammalecte(
-			config.get_value(GrammalecteConfig.GRAMMALECTE_PYTHON_EXE),
-			config.get_value(GrammalecteConfig.GRAMMALECTE_CLI),
-			config.get_value(GrammalecteConfig.GRAMMALECTE_OPTIONS_PARAMS)),
+		self.__set_options(
+			_OptionsFetch.get(GrammalecteConfigDlg.__get_process_args(config)),
 			config.get_value(GrammalecteConfig.GRAMMALECTE_OPTIONS_REGEX))
 		self.__set_options_value(
 			GrammalecteConfig(), GrammalecteConfigDlg.__OPTION_GVAL)
@@ -126,20 +209,27 @@ class GrammalecteConfigDlg:
 		waitDlg.destroy()
 		self.__flush_events()
 
-	def __call_grammalecte(self, pythonExe, gramCli, gramOpts):
-		""" Call the Grammalecte process to get available options """
+	@staticmethod
+	def prefetch_options(config):
+		"""
+			Get the available options from Grammalecte in background.
+
+			:param config: the configuration giving the Grammalecte command.
+			:type config: GrammalecteConfig
+		"""
+		_OptionsFetch.start(GrammalecteConfigDlg.__get_process_args(config))
+
+	@staticmethod
+	def __get_process_args(config):
+		""" Get the arguments of the Grammalecte process giving the options """
 		processArgs = []
-		processArgs.append(pythonExe)
-		processArgs.append(gramCli)
-		for arg in gramOpts:
+		processArgs.append(
+			config.get_value(GrammalecteConfig.GRAMMALECTE_PYTHON_EXE))
+		processArgs.append(config.get_value(GrammalecteConfig.GRAMMALECTE_CLI))
+		for arg in config.get_value(
+			GrammalecteConfig.GRAMMALECTE_OPTIONS_PARAMS):
 			processArgs.append(arg)
-		process = subprocess.Popen(
-			processArgs, stdout = subprocess.PIPE, stderr = subprocess.PIPE)
-		rawOptions, processError = process.communicate()
-		if process.returncode != 0:
-			print _("Error: Grammalecte process did not terminate" \
-				" properly:\n{}").format(processError)
-		return rawOptions
+		return processArgs
 
 	def __set_options(self, rawOptions, regex):
 		""" Set the options from the raw result """
@@ -33,7 +33,7 @@
 
 from g_config import GrammalecteConfig
 
-from g_error import GErrorDesc, GErrorStore
+from g_error import GError, GErrorDesc, GErrorStore
 
 class _GJsonEntry:
 	""" Entries of the Grammalecte JSON file """
@@ -77,33 +77,40 @@ class GErrorConverter:
 			GrammalecteConfig.IGNORED_ERRORS):
 			self.__ignoredErrors.append(tuple(ignored))
 
-	def convert(self, analyzerFormat):
+	def convert(self, analyzerFormat, purge = True):
 		"""
 			Convert the analyzer format to internal format.
 
+			The ignored errors which are not found in the result are removed
+			from the configuration, unless the purge is disabled, e.g. because
+			the result is only partial.
+
 			:param analyzerFormat: the analyzer result.
+			:param purge: (optional) indicate if unused ignored errors must be
+				removed.
 			:type analyzerFormat: dict
+			:type purge: bool
 			:return: the internal format
 			:rtype: GErrorStore
 		"""
-		store = GErrorStore()
+		errors = []
 		for parErrors in analyzerFormat:
 			for grammError in parErrors[_GJsonEntry.GRAMMAR]:
 				error = self.__convertError(grammError)
 				if not self.__ignoreError(error):
-					store.add(error)
+					errors.append(error)
 			if self.__checkSpell:
 				for spellError in parErrors[_GJsonEntry.SPELLING]:
 					error = self.__convertError(spellError)
 					if not self.__ignoreError(error):
-						store.add(error)
+						errors.append(error)
 
-		for ignored in self.__ignoredErrors:
+		for ignored in self.__ignoredErrors if purge else []:
 			if not ignored in self.__usedIgnored:
 				self.__config.del_value(
 					GrammalecteConfig.IGNORED_ERRORS, list(ignored))
 
-		return store
+		return GErrorStore(errors)
 
 	def __convertError(self, gError):
 		"""
@@ -112,35 +119,28 @@ class GErrorConverter:
 			:param gError: the error.
 			:type gError: dict
 			:return: the formated error
-			:rtype: dict
+			:rtype: GError
 		"""
-		error = {}
-		error[GErrorDesc.START] = (
-			gError[_GJsonEntry.LINE_START] - 1,
-			gError[_GJsonEntry.CHAR_START]
-		)
-		error[GErrorDesc.END] = (
-			gError[_GJsonEntry.LINE_END] - 1,
-			gError[_GJsonEntry.CHAR_END]
-		)
 		before = self.__extract(gError, _GJsonEntry.BEFORE, "")
 		after = self.__extract(gError, _GJsonEntry.AFTER, "")
 		word = self.__extract(
 			gError, _GJsonEntry.WORD, _GJsonEntry.SPELL_WORD, True)
-		error[GErrorDesc.CONTEXT] = (before, word, after)
-		error[GErrorDesc.DESCRIPTION] = self.__extract(
-			gError, _GJsonEntry.MESSAGE, self.__spellDescription)
 		url = self.__extract(gError, _GJsonEntry.URL, "")
-		error[GErrorDesc.URL] = None if url == "" else url
-		error[GErrorDesc.SUGGESTIONS] = self.__extract(
-			gError, _GJsonEntry.SUGGESTIONS, [])
-		error[GErrorDesc.OPTION] = self.__extract(
-			gError,
-			_GJsonEntry.OPTION,
-			GrammalecteConfig.GRAMMALECTE_OPTION_SPELLING)
-		error[GErrorDesc.RULE] = self.__extract(
-			gError, _GJsonEntry.RULE, None)
-		return error
+		return GError(
+			(gError[_GJsonEntry.LINE_START] - 1,
+			gError[_GJsonEntry.CHAR_START]),
+			(gError[_GJsonEntry.LINE_END] - 1,
+			gError[_GJsonEntry.CHAR_END]),
+			(before, word, after),
+			self.__extract(
+				gError, _GJsonEntry.MESSAGE, self.__spellDescription),
+			None if url == "" else url,
+			self.__extract(gError, _GJsonEntry.SUGGESTIONS, []),
+			self.__extract(
+				gError,
+				_GJsonEntry.OPTION,
+				GrammalecteConfig.GRAMMALECTE_OPTION_SPELLING),
+			self.__extract(gError, _GJsonEntry.RULE, None))
 
 	def __extract(self, gError, key, default, defaultIsKey = False):
 		"""
@@ -170,7 +170,7 @@ class GErrorConverter:
 			Check if the formated error should be ignored.
 
 			:param error: the formatted error.
-			:type error: dict
+			:type error: GError
 			:return: True if should be ignored, False otherwise.
 			:rtype: bool
 		"""
@@ -34,7 +34,8 @@
 """
 	Manage the errors of pluma-grammalecte.
 
-	Errors are simple dictionnaries containing the following values:
+	Errors are compact records, which are read like dictionnaries, and contain
+	the following values:
 	start: a tuple containing line, offset of the start of error,
 	end: a tuple containing line, offset of the end of error,
 	context: a tuple of 3 strings containing error context,
@@ -47,513 +48,455 @@
 	rule: the name of the rule detecting this kind of error, this may be None
 		as all options do not have rules (spelling case).
 
-	In order to speed up the search of an error for a given position in the
-	text, errors are stored in an AVL tree, also defined in this module.
-"""
-
-class _BNode:
-	"""
-		A node of a binary tree.
+	The same descriptions, URLs, options and rules are found in many errors,
+	so only one copy of each of these strings is kept.
 
-		A node contains a value, a parent, a left and an right child. The
-		parent node may be null (root node).
+	In order to speed up the search of errors for a given position in the
+	text, errors are stored in arrays sorted on their start position, which
+	are indexed as an interval tree.
 
-		Note that node removal is not implemented.
-	"""
+	The positions of the errors are the ones of the analyzed text. When the
+	text is edited, the edits are logged in the store, which translates the
+	positions between the analyzed text and the current text.
+"""
 
-	def __init__(self, element):
-		"""
-			Create the node under the given parent.
+from bisect import bisect_left, bisect_right
 
-			:param element: the element to store in this node.
-			:type element: any
-		"""
-		self.__element = element
-		self.__parent = None
-		self.__left = None
-		self.__right = None
-		self.__height = None
+class GErrorDesc:
+	""" Entries which must be in error object """
+	START = "start"
+	END = "end"
+	CONTEXT = "context"
+	DESCRIPTION = "description"
+	URL = "url"
+	SUGGESTIONS = "suggestions"
+	OPTION = "option"
+	RULE = "rule"
 
-	def saw_children(self):
-		"""
-			Saw the children from the tree starting at this node.
-		"""
-		if self.__left is not None:
-			self.__left.saw_children()
-			self.__left.__parent = None
-			self.__left = None
-		if self.__right is not None:
-			self.__right.saw_children()
-			self.__right.__parent = None
-			self.__right = None
+# Maximal count of strings kept by _share
+_SHARED_MAX_COUNT = 4096
+_sharedStrings = {}
 
-	def __iter__(self):
-		"""
-			Iterate on the tree for which this node is root.
+def _share(value):
+	"""
+		Get the shared copy of a string.
 
-			This will create a generator to iterate on all elements.
-		"""
-		if self.__left is not None:
-			for element in self.__left:
-				yield element
-		yield self.__element
-		if self.__right is not None:
-			for element in self.__right:
-				yield element
+		Shared strings are forgotten when there are too many of them, so that
+		strings which are not used anymore are not kept forever.
 
-	def __len__(self):
-		"""
-			Count the elements in the tree for which this node is root.
+		:param value: the string.
+		:type value: str
+		:return: the shared string equal to the given one.
+		:rtype: str
+	"""
+	if value is None:
+		return None
+	shared = _sharedStrings.get(value)
+	if shared is None:
+		if len(_sharedStrings) >= _SHARED_MAX_COUNT:
+			_sharedStrings.clear()
+		_sharedStrings[value] = value
+		shared = value
+	return shared
+
+class GError(object):
+	"""
+		An error.
 
-			:return: the count of elements in this tree.
-			:rtype: int
-		"""
-		count = 1
-		if self.__left is not None:
-			count += len(self.__left)
-		if self.__right is not None:
-			count += len(self.__right)
-		return count
-
-	def __str__(self):
-		"""
-			Create a string representing the tree for which this node is root.
-
-			:return: the string representing the node.
-			:rtype: str
-		"""
-		result = ""
-		if self.__left is not None:
-			result += str(self.__left) + ", "
-		result += str(self.__element)
-		if self.__right is not None:
-			result += ", " + str(self.__right)
-		return result
-
-	def add(self, node, comparator):
-		"""
-			Add a node in the tree for which this node is root.
-
-			After addition, the tree may not be balanced.
-			The comparator is a fuction taking two parameters (the compared
-			node elements) and returning either a negative value if the left
-			element is smaller than the right one, a positive value if the left
-			node element is bigger than the right one or 0 if the node elements
-			are of same weight.
-
-			:param node: the node to insert.
-			:param comparator: the comparator to use for sorting elements.
-			:type node: _BNode
-			:type comparator: function
-		"""
-		result = comparator(node.__element, self.__element)
-		if result < 0:
-			if self.__left is None:
-				self.__left = node
-				node.__parent = self
-				self.__invalidate_height()
-			else:
-				self.__left.add(node, comparator)
-		else:
-			if self.__right is None:
-				self.__right = node
-				node.__parent = self
-				self.__invalidate_height()
-			else:
-				self.__right.add(node, comparator)
-
-	def balance(self):
-		"""
-			Balance the tree starting at this node.
-
-			This will balance up to the root of the tree. This method should be
-			called after each tree insertion for an AVL tree. Balancing the
-			tree may require to change the tree root.
-
-			:return: the new tree root.
-			:rtype: _BNode
-		"""
-		leftHeight = _BNode.__height(self.__left)
-		rightHeight = _BNode.__height(self.__right)
-		if leftHeight - rightHeight > 1:
-			if _BNode.__height(self.__left.__left) >= \
-				_BNode.__height(self.__left.__right):
-				self.__right_rotate()
-			else:
-				self.__left.__left_rotate()
-				self.__right_rotate()
-		elif rightHeight - leftHeight > 1:
-			if _BNode.__height(self.__right.__right) >= \
-				_BNode.__height(self.__right.__left):
-				self.__left_rotate()
-			else:
-				self.__right.__right_rotate()
-				self.__left_rotate()
-		if self.__parent is not None:
-			return self.__parent.balance()
-		else:
-			return self
-
-	def __left_rotate(self):
-		"""
-			Rotate this node to the left of its right child.
-
-			The right child must exist, but not the parent.
-		"""
-		rotated = self.__right
-		rotated.__parent = self.__parent
-		if rotated.__parent is not None:
-			if rotated.__parent.__left is self:
-				rotated.__parent.__left = rotated
-			elif rotated.__parent.__right is self:
-				rotated.__parent.__right = rotated
-		self.__right = rotated.__left
-		if self.__right is not None:
-			self.__right.__parent = self
-		rotated.__left = self
-		self.__parent = rotated
-		self.__invalidate_height()
-
-	def __right_rotate(self):
-		"""
-			Rotate this node to the right of its left child.
-
-			The left child must exist, but not the parent.
-		"""
-		rotated = self.__left
-		rotated.__parent = self.__parent
-		if rotated.__parent is not None:
-			if rotated.__parent.__left is self:
-				rotated.__parent.__left = rotated
-			elif rotated.__parent.__right is self:
-				rotated.__parent.__right = rotated
-		self.__left = rotated.__right
-		if self.__left is not None:
-			self.__left.__parent = self
-		rotated.__right = self
-		self.__parent = rotated
-		self.__invalidate_height()
-
-	def search(self, comparator):
-		"""
-			Find a node matching the given comparator.
-
-			The comparator is a fuction taking one parameter (the node element)
-			and returning either a negative value (if the node element is too
-			small), a positive value (if the node element is too big) or 0 if
-			the node element is matching.
-
-			:param comparator: the comparator used for searching.
-			:type comparator: function
-			:return: the found node or None if none found.
-			:rtype: _BNode
-		"""
-		result = comparator(self.__element)
-		if result == 0:
-			return self
-		elif result < 0 and self.__right is not None:
-			return self.__right.search(comparator)
-		elif result > 0 and self.__left is not None:
-			return self.__left.search(comparator)
-		else:
-			return None
+		The values of the error are read with the GErrorDesc keys, as for a
+		dictionnary.
 
-	def get_element(self):
-		"""
-			Get the element inside this node.
+		:Example:
 
-			:return: the element inside this node.
+		>>> error = GError((1, 2), (1, 8), ("", "word", ""), "description",
+		... None, [], "option", None)
+		>>> error[GErrorDesc.START], error[GErrorDesc.OPTION]
+		((1, 2), 'option')
+		>>> error.rule is None
+		True
+	"""
+	__slots__ = (GErrorDesc.START, GErrorDesc.END, GErrorDesc.CONTEXT,
+		GErrorDesc.DESCRIPTION, GErrorDesc.URL, GErrorDesc.SUGGESTIONS,
+		GErrorDesc.OPTION, GErrorDesc.RULE)
+
+	def __init__(self, start, end, context, description, url, suggestions,
+		option, rule):
+		"""
+			Create the error.
+
+			:param start: the line and offset of the start of error.
+			:param end: the line and offset of the end of error.
+			:param context: the text before, in and after the error.
+			:param description: the description of the error.
+			:param url: the URL explaining the error, or None.
+			:param suggestions: the replacement suggestions.
+			:param option: the option detecting this kind of error.
+			:param rule: the rule detecting this kind of error, or None.
+			:type start: tuple
+			:type end: tuple
+			:type context: tuple
+			:type description: str
+			:type url: str
+			:type suggestions: list
+			:type option: str
+			:type rule: str
+		"""
+		self.start = start
+		self.end = end
+		self.context = context
+		self.description = _share(description)
+		self.url = _share(url)
+		self.suggestions = suggestions
+		self.option = _share(option)
+		self.rule = _share(rule)
+
+	def __getitem__(self, key):
+		"""
+			Get a value of the error.
+
+			:param key: the value name, one of GErrorDesc values.
+			:type key: str
+			:return: the value.
 			:rtype: any
 		"""
-		return self.__element
-
-	def __invalidate_height(self):
-		"""
-			Invalidate the height of this node.
-
-			The previously calculated height may be obsolete, it will have to
-			be recalculated if needed.
-		"""
-		self.__height = None
-		if self.__parent is not None:
-			self.__parent.__invalidate_height()
+		try:
+			return getattr(self, key)
+		except AttributeError:
+			raise KeyError(key)
 
-	def get_height(self):
-		"""
-			Get the heigh of the tree for which this node is root.
-
-			If the height is unknown, it will be calculated.
-		"""
-		if self.__height is None:
-			leftHeight = _BNode.__height(self.__left)
-			rightHeight = _BNode.__height(self.__right)
-			self.__height = max(leftHeight, rightHeight) + 1
-		return self.__height
-
-	@staticmethod
-	def __height(node):
-		"""
-			Get the heigh of the tree for which given node is root.
-
-			:param node: the node for which to get the height.
-			:type node: _BNode
-		"""
-		return -1 if node is None else node.get_height()
-
-class AvlTree:
+class GErrorStore:
 	"""
-		An AVL binary tree.
+		A store of the errors.
 
-		The tree is always balanced. It contains arbitrary elements. Methods
-		must be provided to the tree in order to sort elements and can also be
-		provided to search elements.
-		An AvlTree is iterable. Elements will then be given in ascending order.
+		The store is built once from all the errors. Errors are sorted on
+		their start line and offset numbers, and kept in parallel arrays.
+		Errors may overlap, e.g. a spelling error inside a grammar error.
 
-		Note that element removal is not implemented.
+		The sorted arrays are seen as an implicit balanced binary tree: the
+		root of a range is the element in its middle. For each root, the
+		highest end of the errors in its range is kept, so that a search can
+		skip the ranges in which no error reaches the searched position.
 
 		:Example:
 
-		>>> tree = AvlTree(lambda a, b: a["value"] - b["value"])
-		>>> len(tree)
-		0
-		>>> tree.get_height()
-		-1
-		>>> print tree
-		<empty>
-
-		>>> tree.add({"value": 5})
-		>>> tree.add({"value": 12})
-		>>> tree.add({"value": 1})
-		>>> tree.add({"value": 9})
-		>>> tree.add({"value": 48})
-		>>> tree.add({"value": 27})
-		>>> tree.add({"value": 6})
-
-		>>> len(tree)
-		7
-		>>> tree.get_height()
-		3
-		>>> print tree
-		{'value': 1}, {'value': 5}, {'value': 6}, {'value': 9}, {'value': 12}, \
-{'value': 27}, {'value': 48}
-		>>> tree.search({"value": 12})
-		{'value': 12}
-		>>> tree.search(lambda e: e["value"] - 27)
-		{'value': 27}
-		>>> tree.search({"value": 128})
+		>>> store = GErrorStore([{"start": (5, 1), "end": (5, 4)},
+		... {"start": (1, 2), "end": (1, 8)},
+		... {"start": (2, 1), "end": (3, 0)},
+		... {"start": (2, 8), "end": (2, 14)}])
+		>>> len(store)
+		4
+		>>> [error["start"] for error in store]
+		[(1, 2), (2, 1), (2, 8), (5, 1)]
+		>>> [error["start"] for error in store.search_all((2, 12))]
+		[(2, 1), (2, 8)]
+		>>> store.search((2, 12))["start"]
+		(2, 1)
+		>>> store.search((5, 6))
+		>>> [error["start"] for error in store.search_range((1, 5), (2, 3))]
+		[(1, 2), (2, 1)]
+		>>> [error["start"] for error in store.get_range(3, 5)]
+		[(2, 1), (5, 1)]
+		>>> store.next_error((2, 1))["start"]
+		(2, 8)
+		>>> store.previous_error((2, 1))["start"]
+		(1, 2)
+		>>> store.next_error((5, 1))
+		>>> store.edit((1, 0), (1, 0), (2, 3))
+		>>> store.get_limits(store.search((2, 6)))
+		((2, 5), (2, 11))
+		>>> store.get_limits(store.next_error((3, 6)))
+		((3, 8), (3, 14))
 	"""
 
-	def __init__(self, comparator, element = None):
+	def __init__(self, errors = ()):
 		"""
-			Create the tree.
+			Create the store.
 
-			The tree can contain a first element, or be empty if no element
-			provided.
-			The comparator is a fuction taking two parameters (the compared
-			node elements) and returning either a negative value if the left
-			element is smaller than the right one, a positive value if the left
-			node element is bigger than the right one or 0 if the node elements
-			are of same weight.
+			Errors given by Grammalecte are already almost sorted, so sorting
+			them is nearly linear.
 
-			:param comparator: the comparator used to sort elements.
-			:param element: the element to insert in the tree (optional).
-			:type comparator: function
-			:type element: any
+			:param errors: (optional) the errors to store.
+			:type errors: list
 		"""
-		self.__comparator = comparator
-		self.__root = None if element is None else _BNode(element)
+		errors = sorted(errors, key = lambda e: e[GErrorDesc.START])
+		self.__errors = errors
+		self.__starts = [error[GErrorDesc.START] for error in errors]
+		self.__ends = [error[GErrorDesc.END] for error in errors]
+		self.__maxEnds = list(self.__ends)
+		self.__index(0, len(errors))
+		self.__edits = []
 
-	def __del__(self):
+	def __index(self, low, high):
 		"""
-			Delete the tree.
+			Compute the highest ends of the given range and its sub-ranges.
 
-			This deletion should imply node deletion too, but because there are
-			mutual dependencies, they may not be correctly garbage collected,
-			so we need to explicitely delete them.
+			:param low: the first index of the range.
+			:param high: the index following the last one of the range.
+			:type low: int
+			:type high: int
+			:return: the highest end in the range, or None if range is empty.
+			:rtype: tuple
 		"""
-		if self.__root is not None:
-			self.__root.saw_children()
+		if low >= high:
+			return None
+		middle = (low + high) // 2
+		self.__maxEnds[middle] = max([end for end in (self.__ends[middle],
+			self.__index(low, middle), self.__index(middle + 1, high))
+			if end is not None])
+		return self.__maxEnds[middle]
 
 	def __iter__(self):
 		"""
-			Iterate on the tree.
-
-			This will create a generator to iterate on all elements.
+			Iterate on the errors, in ascending order.
 		"""
-		if self.__root is not None:
-			for element in self.__root:
-				yield element
+		return iter(self.__errors)
 
 	def __len__(self):
 		"""
-			Return the count of elements in this tree.
+			Return the count of errors in this store.
 
-			:return: the count of elements in the tree.
+			:return: the count of errors.
 			:rtype: int
 		"""
-		return 0 if self.__root is None else len(self.__root)
+		return len(self.__errors)
 
-	def __str__(self):
+	def search(self, position):
 		"""
-			Create a string representing the tree.
+			Search an error at given position.
 
-			:return: the string representing the tree.
-			:rtype: str
-		"""
-		if self.__root is None:
-			return "<empty>"
-		else:
-			return str(self.__root)
+			An error is at the position if the position is between start and end
+			positions of the error, inclusive. If several errors are at the
+			position, the one starting first is given.
 
-	def add(self, element):
+			:param position: the position (line, offset) of the error to search.
+			:type position: tuple
+			:return: the found error or None if none found.
+			:rtype: dict (error)
 		"""
-			Add an element to the tree.
+		errors = self.search_all(position)
+		return errors[0] if len(errors) > 0 else None
 
-			The tree will be automatically balanced after addition.
-
-			:param element: the element to add to the tree.
-			:type element: any
+	def search_all(self, position):
 		"""
-		node = _BNode(element)
-		if self.__root is None:
-			self.__root = node
-		else:
-			self.__root.add(node, self.__comparator)
-			self.__root = node.balance()
+			Search all errors at given position.
 
-	def search(self, data):
+			:param position: the position (line, offset) of the errors.
+			:type position: tuple
+			:return: the found errors, sorted on their start position.
+			:rtype: list
 		"""
-			Search an element in the tree.
-
-			The search can either be done by comparing a given element to the
-			ones in the tree, or by providing a comparator function.
-			The comparator is a fuction taking one parameter (the node element)
-			and returning either a negative value (if the node element is too
-			small), a positive value (if the node element is too big) or 0 if
-			the node element is matching.
+		return self.search_range(position, position)
 
-			:param data: either an element to search in the tree or a
-				comparison function.
-			:type data: any or function
+	def search_range(self, first, last):
 		"""
-		if self.__root is None:
-			result = None
-		elif callable(data):
-			result = self.__root.search(data)
-		else:
-			result = self.__root.search(lambda e: self.__comparator(e, data))
-		if result is None:
-			return None
-		else:
-			return result.get_element()
-
-	def get_height(self):
-		return -1 if self.__root is None else self.__root.get_height()
-
-class GErrorDesc:
-	""" Entries which must be in error object """
-	START = "start"
-	END = "end"
-	CONTEXT = "context"
-	DESCRIPTION = "description"
-	URL = "url"
-	SUGGESTIONS = "suggestions"
-	OPTION = "option"
-	RULE = "rule"
-
-class GErrorStore(AvlTree):
-	"""
-		An AVL tree storing the errors.
-
-		Errors are sorted on their line and offset numbers.
-
-		:Example:
+			Search all errors overlapping the given range.
 
-		>>> store = GErrorStore()
-		>>> store.add({"start": (12,1)})
-		>>> store.add({"start": (2,1)})
-		>>> store.add({"start": (1,2)})
-		>>> store.add({"start": (5,16)})
-		>>> store.add({"start": (5,1)})
+			An error overlaps the range if it starts before the last position
+			and ends after the first position, inclusive.
 
-		>>> len(store)
-		5
-		>>> store.get_height()
-		2
-		>>> print store
-		{'start': (1, 2)}, {'start': (2, 1)}, {'start': (5, 1)}, \
-{'start': (5, 16)}, {'start': (12, 1)}
-	"""
+			:param first: the first position (line, offset) of the range.
+			:param last: the last position (line, offset) of the range.
+			:type first: tuple
+			:type last: tuple
+			:return: the found errors, sorted on their start position.
+			:rtype: list
+		"""
+		found = []
+		self.__collect(0, len(self.__errors), self.__to_origin(first),
+			self.__to_origin(last, True), found)
+		return found
 
-	def __init__(self):
+	def get_range(self, firstLine, lastLine):
 		"""
-			Create the store.
+			Get all errors overlapping the given lines.
+
+			:param firstLine: the first line.
+			:param lastLine: the last line, inclusive.
+			:type firstLine: int
+			:type lastLine: int
+			:return: the found errors, sorted on their start position.
+			:rtype: list
 		"""
-		AvlTree.__init__(self, self.__compare)
+		return self.search_range((firstLine, 0), (lastLine + 1, -1))
 
-	def search(self, data):
+	def next_error(self, position):
 		"""
-			Search the error at given position if data is tuple. Otherwise,
-			simply call super function.
+			Get the first error starting after the given position.
 
-			:param data: the position of the error to search.
-			:type data: tuple
-			:return: the found error or None if none found.
+			:param position: the position (line, offset).
+			:type position: tuple
+			:return: the error, or None if there is no error after position.
 			:rtype: dict (error)
 		"""
-		if type(data) is tuple:
-			return AvlTree.search(self, lambda e: self.__searchComp(e, data))
-		else:
-			return AvlTree.search(self, data)
+		index = bisect_right(self.__starts, self.__to_origin(position, True))
+		return self.__errors[index] if index < len(self.__errors) else None
 
-	def __compare(self, lerror, rerror):
+	def previous_error(self, position):
 		"""
-			Compare two errors.
-
-			The comparison is made on start line and offset numbers.
+			Get the last error starting before the given position.
 
-			:param lerror: the left error.
-			:param rerror: the right error.
-			:type lerror: dict (error)
-			:type rerror: dict (error)
-			:return: negative value if lerror is lower, positive if lerror is
-				bigger, 0 if errors are equal.
-			:rtype: int
+			:param position: the position (line, offset).
+			:type position: tuple
+			:return: the error, or None if there is no error before position.
+			:rtype: dict (error)
 		"""
-		lline, loffset = lerror[GErrorDesc.START]
-		rline, roffset = rerror[GErrorDesc.START]
-		diff = lline - rline
-		return diff if diff != 0 else loffset - roffset
-
-	def __searchComp(self, error, position):
+		index = bisect_left(self.__starts, self.__to_origin(position)) - 1
+		return self.__errors[index] if index >= 0 else None
+
+	def edit(self, start, oldEnd, newEnd):
+		"""
+			Log an edit of the text.
+
+			The text between start and oldEnd is replaced by a text ending at
+			newEnd. Start and oldEnd are positions in the text before the
+			edit, newEnd is a position in the text after the edit. An insertion
+			has equal start and oldEnd, a deletion has equal start and newEnd.
+			Consecutive insertions or deletions, as made when typing, are
+			merged in a single edit.
+
+			:param start: the position (line, offset) where the edit starts.
+			:param oldEnd: the end position of the replaced text.
+			:param newEnd: the end position of the new text.
+			:type start: tuple
+			:type oldEnd: tuple
+			:type newEnd: tuple
+		"""
+		if len(self.__edits) > 0:
+			lastStart, lastOldEnd, lastNewEnd = self.__edits[-1]
+			if start == oldEnd and start == lastNewEnd:
+				self.__edits[-1] = (lastStart, lastOldEnd, newEnd)
+				return
+			if start == newEnd and oldEnd == lastNewEnd and \
+				start >= lastStart:
+				self.__edits[-1] = (lastStart, lastOldEnd, start)
+				return
+			if start == newEnd and oldEnd == lastStart and \
+				lastStart == lastNewEnd:
+				self.__edits[-1] = (start, lastOldEnd, start)
+				return
+		self.__edits.append((start, oldEnd, newEnd))
+
+	def get_limits(self, error):
+		"""
+			Get the limits of an error in the current text.
+
+			:param error: the error.
+			:type error: dict (error)
+			:return: the start and end positions (line, offset) of the error.
+			:rtype: tuple
 		"""
-			Test if the error is at the given position.
+		start = error[GErrorDesc.START]
+		end = error[GErrorDesc.END]
+		for edit in self.__edits:
+			start = _from_origin(start, edit, True)
+			end = _from_origin(end, edit, False)
+		return (start, max(start, end))
 
-			This will be true if the position is between start and end
-			positions of the error. If so, the function will return 0,
-			otherwise, it will return the difference between error start
-			coordinates and given position.
+	def __to_origin(self, position, toRight = False):
+		"""
+			Translate a position of the current text to the analyzed text.
 
-			:param error: the error to test.
-			:param position: the position to test.
-			:type error: dict (error)
+			:param position: the position (line, offset).
+			:param toRight: (optional) indicate if a position at the place of a
+				deleted text must be translated to the end of this text.
 			:type position: tuple
-			:return: negative value if error is too low, positive if too big, 0
-				if error matchs.
-			:rtype: int
-		"""
-		sline, soffset = error[GErrorDesc.START]
-		eline, eoffset = error[GErrorDesc.END]
-		pline, poffset = position
-		if (sline < pline and pline < eline) or \
-			(sline != eline and sline == pline and soffset <= poffset) or \
-			(sline != eline and pline == eline and poffset <= eoffset) or \
-			(sline == eline and sline == pline and \
-			soffset <= poffset and poffset <= eoffset):
-			return 0
-		else:
-			diff = sline - pline
-			return diff if diff != 0 else soffset - poffset
+			:type toRight: bool
+			:return: the position in the analyzed text.
+			:rtype: tuple
+		"""
+		for edit in reversed(self.__edits):
+			position = _to_origin(position, edit, toRight)
+		return position
+
+	def __collect(self, low, high, first, last, found):
+		"""
+			Collect the errors of the given range overlapping the positions.
+
+			:param low: the first index of the range.
+			:param high: the index following the last one of the range.
+			:param first: the first position.
+			:param last: the last position.
+			:param found: the list in which errors are added.
+			:type low: int
+			:type high: int
+			:type first: tuple
+			:type last: tuple
+			:type found: list
+		"""
+		while low < high:
+			middle = (low + high) // 2
+			if self.__maxEnds[middle] < first:
+				return
+			self.__collect(low, middle, first, last, found)
+			if self.__starts[middle] > last:
+				return
+			if self.__ends[middle] >= first:
+				found.append(self.__errors[middle])
+			low = middle + 1
+
+def _shift(position, fromEnd, toEnd):
+	"""
+		Shift a position following an end of edit.
+
+		:param position: the position (line, offset), after fromEnd.
+		:param fromEnd: the end of the edit in the text of position.
+		:param toEnd: the end of the edit in the other text.
+		:type position: tuple
+		:type fromEnd: tuple
+		:type toEnd: tuple
+		:return: the position in the other text.
+		:rtype: tuple
+	"""
+	line, offset = position
+	if line == fromEnd[0]:
+		return (toEnd[0], toEnd[1] + offset - fromEnd[1])
+	return (line + toEnd[0] - fromEnd[0], offset)
+
+def _from_origin(position, edit, moveAtStart):
+	"""
+		Translate a position of the text before the edit to the text after.
+
+		:param position: the position (line, offset).
+		:param edit: the edit (start, oldEnd, newEnd).
+		:param moveAtStart: indicate if a position at the start of the edit
+			must move after the inserted text.
+		:type position: tuple
+		:type edit: tuple
+		:type moveAtStart: bool
+		:return: the position after the edit.
+		:rtype: tuple
+	"""
+	start, oldEnd, newEnd = edit
+	if position < start or (position == start and not moveAtStart):
+		return position
+	if position < oldEnd:
+		return start
+	return _shift(position, oldEnd, newEnd)
+
+def _to_origin(position, edit, toRight):
+	"""
+		Translate a position of the text after the edit to the text before.
+
+		A position inside the inserted text is translated to the start of the
+		edit. A position at the place of a deleted text is translated to the
+		start of this text, or to its end if asked.
+
+		:param position: the position (line, offset).
+		:param edit: the edit (start, oldEnd, newEnd).
+		:param toRight: indicate if a position at the place of a deleted text
+			must be translated to its end.
+		:type position: tuple
+		:type edit: tuple
+		:type toRight: bool
+		:return: the position before the edit.
+		:rtype: tuple
+	"""
+	start, oldEnd, newEnd = edit
+	if position < start or (position == start and not toRight):
+		return position
+	if position < newEnd:
+		return start
+	return _shift(position, newEnd, oldEnd)
 
 if __name__ == "__main__":
 	import doctest
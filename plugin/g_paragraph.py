@@ -0,0 +1,507 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of pluma-grammalecte.
+#
+# pluma-grammalecte is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# pluma-grammalecte is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# pluma-grammalecte. If not, see <http://www.gnu.org/licenses/>.
+#
+# Ce fichier fait partie de pluma-grammalecte.
+#
+# pluma-grammalecte est un logiciel libre ; vous pouvez le redistribuer ou le
+# modifier suivant les termes de la GNU General Public License telle que
+# publiée par la Free Software Foundation ; soit la version 3 de la licence,
+# soit (à votre gré) toute version ultérieure.
+#
+# pluma-grammalecte est distribué dans l'espoir qu'il sera utile, mais SANS
+# AUCUNE GARANTIE ; sans même la garantie tacite de QUALITÉ MARCHANDE ou
+# d'ADÉQUATION à UN BUT PARTICULIER. Consultez la GNU General Public License
+# pour plus de détails.
+#
+# Vous devez avoir reçu une copie de la GNU General Public License en même
+# temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
+# <http://www.gnu.org/licenses>.
+
+
+"""
+	Manage the paragraphs of the analyzed texts.
+
+	The text to analyze is split in paragraphs, which are made of consecutive
+	non blank lines. Each paragraph is identified by a hash of its content, so
+	that only new or modified paragraphs need to be sent to Grammalecte.
+	When the lines changed since the previous version of a text are known,
+	only these lines and the paragraphs touching them are split again.
+
+	Results are handled paragraph by paragraph, in the Grammalecte JSON format,
+	i.e. dictionnaries containing grammar and spelling error lists. Inside a
+	paragraph result, line numbers are relative to the first line of the
+	paragraph.
+"""
+
+import bisect
+import copy
+import hashlib
+
+# Characters of blank lines, the same as in the worker
+_BLANK_CHARACTERS = " \t\r"
+
+class _GJsonEntry:
+	""" Entries of the Grammalecte JSON file used for paragraphs """
+	GRAMMAR = "lGrammarErrors"
+	SPELLING = "lSpellingErrors"
+	LINE_START = "nStartY"
+	LINE_END = "nEndY"
+
+class GParagraph:
+	"""
+		A paragraph of the text.
+
+		:Example:
+
+		>>> paragraph = GParagraph(3, ["Bonjour,", "le monde."])
+		>>> paragraph.firstLine, paragraph.lineCount
+		(3, 2)
+		>>> paragraph.text
+		'Bonjour,\\nle monde.'
+		>>> paragraph.key == GParagraph(12, ["Bonjour,", "le monde."]).key
+		True
+	"""
+
+	def __init__(self, firstLine, lines):
+		"""
+			Create the paragraph.
+
+			:param firstLine: the number of the first line (starting at 0).
+			:param lines: the lines of the paragraph.
+			:type firstLine: int
+			:type lines: list
+		"""
+		self.firstLine = firstLine
+		self.lineCount = len(lines)
+		self.text = "\n".join(lines)
+		self.key = hashlib.md5(self.text).hexdigest()
+
+	def move(self, firstLine):
+		"""
+			Create a copy of the paragraph starting at another line.
+
+			:param firstLine: the number of the first line of the copy.
+			:type firstLine: int
+			:return: the moved paragraph.
+			:rtype: GParagraph
+		"""
+		moved = copy.copy(self)
+		moved.firstLine = firstLine
+		return moved
+
+class GDirtyLines:
+	"""
+		The lines changed since a text was read.
+
+		Changed lines are kept as merged ranges, sorted by line, in the
+		coordinates of the current text. Each range also contains the shift of
+		the lines following it, compared to the text when it was read.
+
+		:Example:
+
+		>>> dirty = GDirtyLines()
+		>>> dirty.edit(2, 2, 4)
+		>>> dirty.edit(10, 12, 10)
+		>>> dirty.get_ranges()
+		[(2, 4, 2), (10, 10, 0)]
+		>>> dirty.edit(3, 10, 3)
+		>>> dirty.get_ranges()
+		[(2, 3, -7)]
+	"""
+
+	def __init__(self):
+		""" Create an empty set of changed lines """
+		self.__ranges = []
+
+	def edit(self, start, oldEnd, newEnd):
+		"""
+			Mark the lines of an edit as changed.
+
+			:param start: the line where the edit starts.
+			:param oldEnd: the line where the replaced text ended.
+			:param newEnd: the line where the new text ends.
+			:type start: int
+			:type oldEnd: int
+			:type newEnd: int
+		"""
+		shift = newEnd - oldEnd
+		before = []
+		after = []
+		first, last, delta = start, newEnd, 0
+		for rangeFirst, rangeLast, rangeDelta in self.__ranges:
+			if rangeLast + 1 < start:
+				before.append((rangeFirst, rangeLast, rangeDelta))
+				delta = rangeDelta
+			elif rangeFirst > oldEnd + 1:
+				after.append((rangeFirst + shift, rangeLast + shift,
+					rangeDelta + shift))
+			else:
+				first = min(first, rangeFirst)
+				if rangeLast > oldEnd:
+					last = max(last, rangeLast + shift)
+				delta = rangeDelta
+		self.__ranges = before + [(first, last, delta + shift)] + after
+
+	def get_ranges(self):
+		"""
+			Get the ranges of changed lines.
+
+			:return: the first and last changed lines of each range, and the
+				shift of the following lines.
+			:rtype: list
+		"""
+		return list(self.__ranges)
+
+def split_paragraphs(text):
+	"""
+		Split the text in paragraphs.
+
+		:Example:
+
+		>>> [(p.firstLine, p.text) for p in split_paragraphs("a\\nb\\n\\n \\nc")]
+		[(0, 'a\\nb'), (4, 'c')]
+
+		:param text: the text to split.
+		:type text: str
+		:return: the paragraphs of the text.
+		:rtype: list
+	"""
+	lines = text.split("\n")
+	return _split_lines(lines, 0, len(lines))
+
+def update_paragraphs(paragraphs, text, dirtyRanges):
+	"""
+		Split the text in paragraphs, reusing the ones of its previous version.
+
+		The paragraphs which neither contain nor touch a changed line are kept,
+		with their lines shifted. Only the lines between them which contain a
+		changed line are split again.
+
+		:Example:
+
+		>>> dirty = GDirtyLines()
+		>>> dirty.edit(3, 3, 4)
+		>>> previous = split_paragraphs("a\\n\\nb\\nc\\n\\nd")
+		>>> paragraphs = update_paragraphs(previous, "a\\n\\nb\\nc\\nx\\n\\nd",
+		... dirty.get_ranges())
+		>>> [(p.firstLine, p.text) for p in paragraphs]
+		[(0, 'a'), (2, 'b\\nc\\nx'), (6, 'd')]
+
+		:param paragraphs: the paragraphs of the previous version of the text.
+		:param text: the text to split.
+		:param dirtyRanges: the lines changed since the previous version, as
+			given by GDirtyLines.
+		:type paragraphs: list
+		:type text: str
+		:type dirtyRanges: list
+		:return: the paragraphs of the text.
+		:rtype: list
+	"""
+	lines = text.split("\n")
+	lasts = [dirtyRange[1] for dirtyRange in dirtyRanges]
+	updated = []
+	index = 0
+	delta = 0
+	end = 0
+	for paragraph in paragraphs:
+		first = paragraph.firstLine
+		last = first + paragraph.lineCount - 1
+		while index < len(dirtyRanges) and \
+			dirtyRanges[index][1] - dirtyRanges[index][2] < first - 1:
+			delta = dirtyRanges[index][2]
+			index += 1
+		if index < len(dirtyRanges) and \
+			dirtyRanges[index][0] - delta <= last + 1:
+			continue
+		start = first + delta
+		updated.extend(_split_changed(lines, end, start, dirtyRanges, lasts))
+		updated.append(paragraph if delta == 0 else paragraph.move(start))
+		end = start + paragraph.lineCount
+	updated.extend(_split_changed(lines, end, len(lines), dirtyRanges, lasts))
+	return updated
+
+def _split_changed(lines, start, end, dirtyRanges, lasts):
+	"""
+		Split the lines in paragraphs, if any of them changed.
+
+		Unchanged lines between kept paragraphs are all blank, and are skipped.
+	"""
+	index = bisect.bisect_left(lasts, start)
+	if index == len(dirtyRanges) or dirtyRanges[index][0] >= end:
+		return []
+	return _split_lines(lines, start, end)
+
+def _split_lines(lines, start, end):
+	"""
+		Split the lines in paragraphs.
+
+		:param lines: the lines of the text.
+		:param start: the first line to split.
+		:param end: the line following the last one to split.
+		:type lines: list
+		:type start: int
+		:type end: int
+		:return: the paragraphs of the lines.
+		:rtype: list
+	"""
+	paragraphs = []
+	parLines = []
+	for lineNumber, line in enumerate(lines[start:end], start):
+		if line.strip(_BLANK_CHARACTERS):
+			parLines.append(line)
+		elif len(parLines) > 0:
+			paragraphs.append(GParagraph(lineNumber - len(parLines), parLines))
+			parLines = []
+	if len(parLines) > 0:
+		paragraphs.append(GParagraph(end - len(parLines), parLines))
+	return paragraphs
+
+def sort_paragraphs(paragraphs, cursorLine, visibleLines):
+	"""
+		Sort the paragraphs so that the ones seen by the user come first.
+
+		The paragraph containing the cursor comes first, then the paragraphs
+		which are at least partly visible, then the other ones. The document
+		order is kept inside each group.
+
+		:Example:
+
+		>>> paragraphs = split_paragraphs("a\\n\\nb\\n\\nc\\nd\\n\\ne")
+		>>> [p.text for p in sort_paragraphs(paragraphs, 7, (3, 4))]
+		['e', 'c\\nd', 'a', 'b']
+
+		:param paragraphs: the paragraphs to sort.
+		:param cursorLine: the line of the cursor, or None if unknown.
+		:param visibleLines: the first and last visible lines, or None if
+			unknown.
+		:type paragraphs: list
+		:type cursorLine: int
+		:type visibleLines: tuple
+		:return: the sorted paragraphs.
+		:rtype: list
+	"""
+	def rank(paragraph):
+		lastLine = paragraph.firstLine + paragraph.lineCount - 1
+		if cursorLine is not None and \
+			paragraph.firstLine <= cursorLine <= lastLine:
+			return 0
+		if visibleLines is not None and \
+			paragraph.firstLine <= visibleLines[1] and \
+			lastLine >= visibleLines[0]:
+			return 1
+		return 2
+	return sorted(paragraphs, key = rank)
+
+def split_shards(paragraphs, count):
+	"""
+		Split the paragraphs in shards of about the same text size.
+
+		The order of the paragraphs is kept.
+
+		:Example:
+
+		>>> paragraphs = split_paragraphs("a\\n\\nb\\n\\nc\\n\\nd\\n\\ne")
+		>>> [[p.text for p in s] for s in split_shards(paragraphs, 2)]
+		[['a', 'b', 'c'], ['d', 'e']]
+
+		:param paragraphs: the paragraphs to split.
+		:param count: the count of shards.
+		:type paragraphs: list
+		:type count: int
+		:return: the shards, as lists of paragraphs. There may be less shards
+			than requested if there are not enough paragraphs.
+		:rtype: list
+	"""
+	total = sum([len(p.text) for p in paragraphs])
+	shards = []
+	shard = []
+	size = 0
+	for paragraph in paragraphs:
+		shard.append(paragraph)
+		size += len(paragraph.text)
+		if len(shards) < count - 1 and \
+			size * count >= total * (len(shards) + 1):
+			shards.append(shard)
+			shard = []
+	if len(shard) > 0:
+		shards.append(shard)
+	return shards
+
+def compose_paragraphs(paragraphs):
+	"""
+		Build a text made of the given paragraphs.
+
+		Paragraphs are separated by a blank line.
+
+		:Example:
+
+		>>> compose_paragraphs(split_paragraphs("a\\n\\n\\nb\\nc\\n\\nd"))
+		('a\\n\\nb\\nc\\n\\nd', [0, 2, 5])
+
+		:param paragraphs: the paragraphs to put in the text.
+		:type paragraphs: list
+		:return: the text and the number of the first line (starting at 0) of
+			each paragraph in this text.
+		:rtype: tuple
+	"""
+	starts = []
+	line = 0
+	for paragraph in paragraphs:
+		starts.append(line)
+		line += paragraph.lineCount + 1
+	return "\n\n".join([p.text for p in paragraphs]), starts
+
+def empty_result():
+	"""
+		Create an empty paragraph result.
+
+		:return: a result without any error.
+		:rtype: dict
+	"""
+	return {_GJsonEntry.GRAMMAR: [], _GJsonEntry.SPELLING: []}
+
+def dispatch_result(analyzerFormat, starts):
+	"""
+		Dispatch the result of a composed text analyzis to its paragraphs.
+
+		Errors located before the first given paragraph are ignored, so that
+		the result can be dispatched to the last paragraphs only.
+
+		:param analyzerFormat: the analyzer result for the composed text.
+		:param starts: the number of the first line of each paragraph in the
+			composed text, as given by compose_paragraphs.
+		:type analyzerFormat: list
+		:type starts: list
+		:return: the result of each paragraph, with line numbers relative to
+			the paragraph.
+		:rtype: list
+	"""
+	results = [empty_result() for start in starts]
+	for parErrors in analyzerFormat:
+		for errorType in (_GJsonEntry.GRAMMAR, _GJsonEntry.SPELLING):
+			for error in parErrors.get(errorType, []):
+				index = bisect.bisect_right(
+					starts, error[_GJsonEntry.LINE_START] - 1) - 1
+				if index < 0:
+					continue
+				results[index][errorType].append(
+					_shift_error(error, -starts[index]))
+	return results
+
+def shift_result(result, firstLine):
+	"""
+		Shift the lines of a paragraph result.
+
+		:Example:
+
+		>>> result = shift_result({"lGrammarErrors": [{"nStartY": 1,
+		... "nEndY": 2}], "lSpellingErrors": []}, 10)
+		>>> error = result["lGrammarErrors"][0]
+		>>> error["nStartY"], error["nEndY"]
+		(11, 12)
+
+		:param result: the paragraph result.
+		:param firstLine: the number of lines to add.
+		:type result: dict
+		:type firstLine: int
+		:return: a new result with shifted lines.
+		:rtype: dict
+	"""
+	shifted = {}
+	for errorType in (_GJsonEntry.GRAMMAR, _GJsonEntry.SPELLING):
+		shifted[errorType] = [
+			_shift_error(e, firstLine) for e in result[errorType]]
+	return shifted
+
+def is_empty_result(result):
+	"""
+		Indicate if a paragraph result contains no error.
+
+		:param result: the paragraph result.
+		:type result: dict
+		:return: True if there is no error, False otherwise.
+		:rtype: bool
+	"""
+	return len(result[_GJsonEntry.GRAMMAR]) == 0 and \
+		len(result[_GJsonEntry.SPELLING]) == 0
+
+def get_line_starts(text):
+	"""
+		Build the table of the line starts of a text.
+
+		:Example:
+
+		>>> get_line_starts(u"ab\\n\\ncde")
+		[0, 3, 4, 8]
+
+		:param text: the text, as unicode, so that offsets are in characters.
+		:type text: unicode
+		:return: the offset of the start of each line, followed by the offset
+			the line after the last one would start at.
+		:rtype: list
+	"""
+	starts = [0]
+	for line in text.split(u"\n"):
+		starts.append(starts[-1] + len(line) + 1)
+	return starts
+
+def get_offset(lineStarts, line, offset):
+	"""
+		Convert a position to an absolute offset in the text.
+
+		The line and the offset are limited to the ones existing in the text.
+
+		:Example:
+
+		>>> starts = get_line_starts(u"ab\\n\\ncde")
+		>>> get_offset(starts, 0, 1), get_offset(starts, 2, 1)
+		(1, 5)
+		>>> get_offset(starts, 0, 5), get_offset(starts, 7, 0)
+		(2, 4)
+
+		:param lineStarts: the table of the line starts.
+		:param line: the line of the position.
+		:param offset: the offset of the position in the line.
+		:type lineStarts: list
+		:type line: int
+		:type offset: int
+		:return: the offset of the position from the start of the text.
+		:rtype: int
+	"""
+	line = min(line, len(lineStarts) - 2)
+	lineStart = lineStarts[line]
+	return lineStart + min(offset, lineStarts[line + 1] - lineStart - 1)
+
+def _shift_error(error, lineCount):
+	"""
+		Create a copy of the error, with shifted lines.
+
+		:param error: the Grammalecte error.
+		:param lineCount: the number of lines to add.
+		:type error: dict
+		:type lineCount: int
+		:return: the shifted error.
+		:rtype: dict
+	"""
+	shifted = dict(error)
+	shifted[_GJsonEntry.LINE_START] += lineCount
+	shifted[_GJsonEntry.LINE_END] += lineCount
+	return shifted
+
+if __name__ == "__main__":
+	import doctest
+	doctest.testmod()
@@ -43,17 +43,36 @@ from g_error import GErrorDesc
 class GPopupMenu():
 	""" Create and manage the popup menu """
 
-	def __init__(self, menu, error, autocorrector):
-		""" Create the menu options """
+	def __init__(self, menu, errors, autocorrector):
+		"""
+			Create the menu options.
+
+			If there are several errors at the position, the suggestion menu
+			contains a sub-menu for each error.
+		"""
 		mi = gtk.SeparatorMenuItem()
 		mi.show()
 		menu.prepend(mi)
 		mi = gtk.ImageMenuItem(gtk.STOCK_SPELL_CHECK)
 		mi.set_label(_("_Suggestions"))
-		mi.set_submenu(self.build_suggestion_menu(error, autocorrector))
+		if len(errors) == 1:
+			mi.set_submenu(self.build_suggestion_menu(errors[0], autocorrector))
+		else:
+			mi.set_submenu(self.build_errors_menu(errors, autocorrector))
 		mi.show_all()
 		menu.prepend(mi)
 
+	def build_errors_menu(self, errors, autocorrector):
+		""" Build the menu containing a suggestion menu for each error """
+		topmenu = gtk.Menu()
+		for error in errors:
+			mi = gtk.MenuItem("{} ({})".format(error[GErrorDesc.CONTEXT][1],
+				error[GErrorDesc.DESCRIPTION]), use_underline = False)
+			mi.set_submenu(self.build_suggestion_menu(error, autocorrector))
+			mi.show_all()
+			topmenu.append(mi)
+		return topmenu
+
 	def build_suggestion_menu(self, error, autocorrector):
 		""" Build the suggestion menu """
 		config = autocorrector.get_config()
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of pluma-grammalecte.
+#
+# pluma-grammalecte is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# pluma-grammalecte is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# pluma-grammalecte. If not, see <http://www.gnu.org/licenses/>.
+#
+# Ce fichier fait partie de pluma-grammalecte.
+#
+# pluma-grammalecte est un logiciel libre ; vous pouvez le redistribuer ou le
+# modifier suivant les termes de la GNU General Public License telle que
+# publiée par la Free Software Foundation ; soit la version 3 de la licence,
+# soit (à votre gré) toute version ultérieure.
+#
+# pluma-grammalecte est distribué dans l'espoir qu'il sera utile, mais SANS
+# AUCUNE GARANTIE ; sans même la garantie tacite de QUALITÉ MARCHANDE ou
+# d'ADÉQUATION à UN BUT PARTICULIER. Consultez la GNU General Public License
+# pour plus de détails.
+#
+# Vous devez avoir reçu une copie de la GNU General Public License en même
+# temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
+# <http://www.gnu.org/licenses>.
+
+"""
+	Schedule the analyzis requests.
+
+	A requester which asks for an analyzis several times before its request
+	is treated has only one pending request: the text is read when the
+	analyzis starts, so the latest content is always the one analyzed.
+
+	Requests are ranked by the priority of their requester, which is read when
+	the next request is taken, so that a requester which got the focus while
+	waiting is treated first.
+
+	Requesters may belong to clients (e.g. windows). For a same priority,
+	clients are served in turn, so that a client with many requests does not
+	delay the other ones.
+"""
+
+from collections import OrderedDict
+
+class GRequestQueue:
+	"""
+		A queue of requesters, with at most one entry per requester.
+
+		Requesters are treated by priority, then by client, the least recently
+		served client first, and then in the order of their first pending
+		request. The lower the priority value, the sooner the requester is
+		treated.
+
+		:Example:
+
+		>>> queue = GRequestQueue()
+		>>> queue.put("a"), queue.put("b"), queue.put("a")
+		(True, True, False)
+		>>> queue.get_queue_depth()
+		2
+		>>> queue.get(), queue.get(), queue.get()
+		('a', 'b', None)
+		>>> queue = GRequestQueue(lambda requester: len(requester))
+		>>> queue.put("aa"), queue.put("b"), queue.put("c")
+		(True, True, True)
+		>>> queue.get(), queue.get(), queue.get()
+		('b', 'c', 'aa')
+		>>> queue = GRequestQueue(None, lambda requester: requester[0])
+		>>> queue.put("a1"), queue.put("a2"), queue.put("b1")
+		(True, True, True)
+		>>> queue.get(), queue.get(), queue.get()
+		('a1', 'b1', 'a2')
+	"""
+
+	def __init__(self, priority = None, client = None):
+		"""
+			Create an empty queue.
+
+			:param priority: the function giving the priority of a requester,
+				or None if all requesters have the same priority.
+			:param client: the function giving the client of a requester, or
+				None if all requesters belong to the same client.
+			:type priority: function
+			:type client: function
+		"""
+		self.__requesters = OrderedDict()
+		self.__priority = priority
+		self.__client = client
+		self.__served = {}
+		self.__serial = 0
+
+	def __len__(self):
+		""" Get the count of pending requests """
+		return len(self.__requesters)
+
+	def __contains__(self, requester):
+		""" Indicate if the requester has a pending request """
+		return requester in self.__requesters
+
+	def get_queue_depth(self):
+		"""
+			Get the count of pending requests.
+
+			:return: the count of requesters waiting for an analyzis.
+			:rtype: int
+		"""
+		return len(self.__requesters)
+
+	def is_empty(self):
+		"""
+			Indicate if there is no pending request.
+
+			:return: True if the queue is empty.
+			:rtype: bool
+		"""
+		return len(self.__requesters) == 0
+
+	def put(self, requester):
+		"""
+			Add a request to the queue.
+
+			If the requester already has a pending request, the new request is
+			merged with it.
+
+			:param requester: the requester.
+			:type requester: GrammalecteRequester
+			:return: True if the request was added, False if it was merged.
+			:rtype: bool
+		"""
+		if requester in self.__requesters:
+			return False
+		self.__requesters[requester] = True
+		return True
+
+	def get(self, busy = ()):
+		"""
+			Take the next request from the queue.
+
+			:param busy: (optional) the requesters which must not be taken,
+				because they are already being analyzed.
+			:type busy: set
+			:return: the requester, or None if the queue contains no request
+				which can be taken.
+			:rtype: GrammalecteRequester
+		"""
+		candidates = [r for r in self.__requesters if r not in busy]
+		if len(candidates) == 0:
+			return None
+		requester = min(enumerate(candidates), key = self.__rank)[1]
+		del self.__requesters[requester]
+		if self.__client is not None:
+			self.__serve(self.__client(requester))
+		return requester
+
+	def __rank(self, candidate):
+		""" Get the rank of a candidate, given with its arrival index """
+		index, requester = candidate
+		priority = 0 if self.__priority is None else \
+			self.__priority(requester)
+		served = 0 if self.__client is None else \
+			self.__served.get(self.__client(requester), 0)
+		return (priority, served, index)
+
+	def __serve(self, client):
+		"""
+			Indicate that a request of the client is taken.
+
+			Clients without pending request are forgotten: they will be served
+			first when they come back.
+		"""
+		self.__serial += 1
+		clients = set([self.__client(r) for r in self.__requesters])
+		clients.add(client)
+		self.__served = dict([(c, s) for c, s in self.__served.iteritems()
+			if c in clients])
+		self.__served[client] = self.__serial
+
+	def remove(self, requester):
+		"""
+			Remove the pending request of the requester, if any.
+
+			:param requester: the requester.
+			:type requester: GrammalecteRequester
+		"""
+		self.__requesters.pop(requester, None)
+
+	def clear(self):
+		""" Remove all pending requests """
+		self.__requesters.clear()
+
+if __name__ == "__main__":
+	import doctest
+	doctest.testmod()
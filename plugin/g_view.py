@@ -90,6 +90,16 @@ class GrammalecteViewHelper(SelfConfigContainer):
 			self.__autocorrect.deactivate()
 			self.__autocorrect = None
 
+	def goto_next_error(self):
+		""" Select the next error, if automatic check is on """
+		if self.__autocorrect is not None:
+			self.__autocorrect.goto_next_error()
+
+	def goto_previous_error(self):
+		""" Select the previous error, if automatic check is on """
+		if self.__autocorrect is not None:
+			self.__autocorrect.goto_previous_error()
+
 	def on_doc_saved(self, document, error):
 		""" Manage the document saved event """
 		if error is None:
@@ -147,3 +157,11 @@ class GrammalecteViewHelper(SelfConfigContainer):
 		""" Get the analyzer """
 		return self.__windowHelper.get_analyzer()
 
+	def get_priority(self):
+		""" Get the analyzis priority of the view """
+		return self.__windowHelper.get_view_priority(self.__view)
+
+	def get_client(self):
+		""" Get the window helper, client of the analyzer """
+		return self.__windowHelper
+
@@ -31,11 +31,12 @@
 # temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
 # <http://www.gnu.org/licenses>.
 
+import gobject
 import gtk
 
 from g_config import GrammalecteConfig
 
-from g_analyzer import GrammalecteAnalyzer
+from g_analyzer import GrammalecteRequester, GrammalecteAnalyzer
 from g_config_dlg import GrammalecteConfigDlg
 from g_view import GrammalecteViewHelper
 
@@ -47,6 +48,9 @@ _ui_str = """
 			<placeholder name="ToolsOps_1">
 				<separator />
 				<menuitem name="AutoGrammalecte" action="AutoGrammalecte"/>
+				<menuitem name="NextGrammalecte" action="NextGrammalecte"/>
+				<menuitem name="PreviousGrammalecte"
+					action="PreviousGrammalecte"/>
 				<menuitem name="ConfigGrammalecte" action="ConfigGrammalecte"/>
 				<separator />
 			</placeholder>
@@ -66,11 +70,18 @@ class GrammalecteWindowHelper:
 		self.__statusBar = self.__window.get_statusbar()
 		self.__sbContext = self.__statusBar.get_context_id(
 			GrammalecteWindowHelper.__STATUS_BAR_TAG)
-		self.__analyzer = GrammalecteAnalyzer()
+		self.__analyzer = GrammalecteAnalyzer.acquire()
+		self.__analyzing = set()
+		self.__loading = False
 		self.__eventAnalyzeStartId = self.__analyzer.connect(
 			"analyze-started", self.on_analyze_started)
 		self.__eventAnalyzeFinishId = self.__analyzer.connect(
 			"analyze-finished", self.on_analyze_finished)
+		self.__eventEngineReadyId = self.__analyzer.connect(
+			"engine-ready", self.on_engine_ready)
+		self.__eventEngineFailedId = self.__analyzer.connect(
+			"engine-failed", self.on_engine_failed)
+		self.__prewarmId = gobject.idle_add(self.__prewarm)
 		self.__eventTabRemovedId = self.__window.connect(
 			"tab-removed", self.on_tab_removed)
 		for view in self.__window.get_views():
@@ -86,9 +97,19 @@ class GrammalecteWindowHelper:
 		for view in self.__window.get_views():
 			self.__deassociate(view)
 		self.__window.disconnect(self.__eventTabRemovedId)
+		if self.__prewarmId is not None:
+			gobject.source_remove(self.__prewarmId)
+			self.__prewarmId = None
+		self.__analyzer.disconnect(self.__eventEngineFailedId)
+		self.__analyzer.disconnect(self.__eventEngineReadyId)
 		self.__analyzer.disconnect(self.__eventAnalyzeFinishId)
 		self.__analyzer.disconnect(self.__eventAnalyzeStartId)
-		self.__analyzer.terminate()
+		for requester in self.__analyzing:
+			self.__statusBar.pop(self.__sbContext)
+		self.__analyzing = None
+		if self.__loading:
+			self.__statusBar.pop(self.__sbContext)
+		self.__analyzer.release()
 		self.__analyzer = None
 		self.__sbContext = None
 		self.__statusBar = None
@@ -104,6 +125,18 @@ class GrammalecteWindowHelper:
 			"<shift>F7",
 			_("Check the current document for incorrect grammar and spelling"),
 			self.on_menu_check),
+			("NextGrammalecte",
+			gtk.STOCK_GO_DOWN,
+			_("_Next Error"),
+			"<control>F7",
+			_("Go to the next grammar or spelling error"),
+			self.on_menu_next),
+			("PreviousGrammalecte",
+			gtk.STOCK_GO_UP,
+			_("_Previous Error"),
+			"<control><shift>F7",
+			_("Go to the previous grammar or spelling error"),
+			self.on_menu_previous),
 			('ConfigGrammalecte',
 			None,
 			_('Configure _Grammalecte...'),
@@ -126,13 +159,53 @@ class GrammalecteWindowHelper:
 		manager.remove_action_group(self.__actionGroup)
 		manager.ensure_update()
 
-	def on_analyze_started(self, *ignored):
+	def on_analyze_started(self, analyzer, requester):
+		""" Manage the analyze started event for the window requesters """
+		if requester.get_client() is not self:
+			return
+		self.__analyzing.add(requester)
 		self.__statusBar.push(
 			self.__sbContext, _("Linguistic checking in progress..."))
 
-	def on_analyze_finished(self, *ignored):
+	def on_analyze_finished(self, analyzer, requester, *ignored):
+		""" Manage the analyze finished event for the window requesters """
+		if requester not in self.__analyzing:
+			return
+		self.__analyzing.remove(requester)
 		self.__statusBar.pop(self.__sbContext)
 
+	def __prewarm(self):
+		"""
+			Start the Grammalecte engine before it is needed.
+
+			The options of Grammalecte are fetched once the engine is loaded,
+			in order not to load two engines at the same time.
+		"""
+		self.__prewarmId = None
+		config = GrammalecteConfig()
+		if self.__analyzer.prewarm(config):
+			self.__loading = True
+			self.__statusBar.push(
+				self.__sbContext, _("Loading Grammalecte..."))
+		else:
+			GrammalecteConfigDlg.prefetch_options(config)
+		return False
+
+	def on_engine_ready(self, analyzer):
+		""" Manage the engine ready event """
+		self.__end_loading()
+
+	def on_engine_failed(self, analyzer):
+		""" Manage the engine failed event """
+		self.__end_loading()
+
+	def __end_loading(self):
+		""" Remove the loading message, if displayed """
+		if self.__loading:
+			self.__loading = False
+			self.__statusBar.pop(self.__sbContext)
+			GrammalecteConfigDlg.prefetch_options(GrammalecteConfig())
+
 	def on_tab_added(self, action, tab):
 		""" Mange the tab added event """
 		self.__associate(tab.get_view())
@@ -153,6 +226,10 @@ class GrammalecteWindowHelper:
 		self.__actionGroup.get_action("AutoGrammalecte").set_sensitive(
 			sensitive)
 		self.__actionGroup.get_action("AutoGrammalecte").set_active(autoActive)
+		self.__actionGroup.get_action("NextGrammalecte").set_sensitive(
+			autoActive)
+		self.__actionGroup.get_action("PreviousGrammalecte").set_sensitive(
+			autoActive)
 
 	def __associate(self, view):
 		""" Associate view and helper """
@@ -171,11 +248,24 @@ class GrammalecteWindowHelper:
 	def on_menu_check(self, action):
 		pass
 
+	def on_menu_next(self, action):
+		""" Go to next error """
+		helper = self.__get_active_helper()
+		if helper is not None:
+			helper.goto_next_error()
+
+	def on_menu_previous(self, action):
+		""" Go to previous error """
+		helper = self.__get_active_helper()
+		if helper is not None:
+			helper.goto_previous_error()
+
 	def on_menu_auto(self, action):
 		""" Manage automatic toggle menu """
 		helper = self.__get_active_helper()
 		if helper is not None and not helper.is_readonly():
 			helper.set_auto_analyze(action.get_active())
+		self.update_ui()
 
 	def on_menu_config(self, action):
 		""" Change configuration """
@@ -184,6 +274,15 @@ class GrammalecteWindowHelper:
 	def get_analyzer(self):
 		return self.__analyzer
 
+	def get_view_priority(self, view):
+		""" Get the analyzis priority of the view """
+		if view is not self.__window.get_active_view():
+			return GrammalecteRequester.PRIORITY_BACKGROUND
+		elif self.__window.is_active():
+			return GrammalecteRequester.PRIORITY_ACTIVE
+		else:
+			return GrammalecteRequester.PRIORITY_VISIBLE
+
 	def __get_active_helper(self):
 		""" Get the helper of active view """
 		return self.__get_associated_helper(self.__window.get_active_view())
@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of pluma-grammalecte.
+#
+# pluma-grammalecte is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# pluma-grammalecte is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# pluma-grammalecte. If not, see <http://www.gnu.org/licenses/>.
+#
+# Ce fichier fait partie de pluma-grammalecte.
+#
+# pluma-grammalecte est un logiciel libre ; vous pouvez le redistribuer ou le
+# modifier suivant les termes de la GNU General Public License telle que
+# publiée par la Free Software Foundation ; soit la version 3 de la licence,
+# soit (à votre gré) toute version ultérieure.
+#
+# pluma-grammalecte est distribué dans l'espoir qu'il sera utile, mais SANS
+# AUCUNE GARANTIE ; sans même la garantie tacite de QUALITÉ MARCHANDE ou
+# d'ADÉQUATION à UN BUT PARTICULIER. Consultez la GNU General Public License
+# pour plus de détails.
+#
+# Vous devez avoir reçu une copie de la GNU General Public License en même
+# temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
+# <http://www.gnu.org/licenses>.
+
+
+"""
+	Persistent Grammalecte worker.
+
+	This script is not part of the plugin itself: it is run with the Python 3
+	interpreter used for Grammalecte, and given the path to the Grammalecte
+	command line interface as argument. It loads the engine once, and then
+	reads requests on its standard input and writes answers on its standard
+	output, one JSON object per line. Once the engine is loaded, a ready line
+	is written, so that the client knows analyzis can start without delay.
+
+	A request contains the following values:
+	id: the identifier of the request, copied in the answer,
+	text: the text to analyze,
+	options: a dictionnary of the options to set on or off,
+	rules: a list of the rules to ignore,
+	params: the analyzis parameters of the command line interface, of which
+	only -cl (concatenate lines), -owe (only paragraphs with errors) and -ctx
+	(context of errors) are used.
+
+	The answer is made of several lines, each one containing the identifier
+	of the request. A progress line is written after each analyzed paragraph,
+	with the number of the last line of the paragraph (starting at 1) and the
+	data for this paragraph (which has the same format as the data returned
+	by the command line interface). The answer ends with an end line, a
+	cancelled line, or an error description.
+
+	A request can be cancelled by sending a cancel message containing its
+	identifier. The analyzis then stops before the next paragraph.
+
+	When run with the --daemon option followed by a socket path, the worker
+	listens on this Unix socket instead, and serves any number of clients
+	with the same protocol. The engine is shared by all the clients, and
+	their paragraphs are analyzed in turn. The daemon stops when it has no
+	client for some time.
+"""
+
+import collections
+import io
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+import traceback
+
+# Minimal time between two flushes of the output
+_FLUSH_DELAY = 0.05
+
+# Time without client after which the daemon stops
+_DAEMON_IDLE_DELAY = 600
+
+# Characters of blank lines, the same as in the plugin paragraphs
+_BLANK_CHARACTERS = " \t\r"
+
+class _Engine:
+	""" The Grammalecte engine, loaded once """
+
+	def __init__(self, gramCli):
+		"""
+			Load the engine.
+
+			:param gramCli: the path to the Grammalecte command line interface.
+			:type gramCli: str
+		"""
+		sys.path.insert(0, os.path.dirname(os.path.abspath(gramCli)))
+		import grammalecte
+		import grammalecte.text
+		self.__text = grammalecte.text
+		self.__checker = grammalecte.GrammarChecker("fr")
+		self.__gce = self.__checker.getGCEngine()
+		self.__lock = threading.Lock()
+		self.__settings = None
+
+	def __apply_settings(self, options, rules):
+		""" Set the options and rules in the engine, if they changed """
+		settings = json.dumps([options, rules], sort_keys = True)
+		if settings == self.__settings:
+			return
+		self.__gce.resetOptions()
+		self.__gce.setOptions(options)
+		self.__gce.resetIgnoreRules()
+		for rule in rules:
+			self.__gce.ignoreRule(rule)
+		self.__settings = settings
+
+	def analyze(self, text, options, rules, params):
+		"""
+			Analyze the given text.
+
+			Lines which are not separated by a blank line are concatenated if
+			asked, as the command line interface does. Otherwise, each line is
+			analyzed on its own, but the errors are still given for all the
+			lines between blank lines at once. The engine may be shared by
+			several threads, which analyze their paragraphs in turn.
+
+			:param text: the text to analyze.
+			:param options: the options to set on or off.
+			:param rules: the rules to ignore.
+			:param params: the analyzis parameters of the command line.
+			:type text: str
+			:type options: dict
+			:type rules: list
+			:type params: list
+			:return: a generator giving, for each paragraph, the number of its
+				last line and its errors.
+			:rtype: generator
+		"""
+		concatLines = "-cl" in params
+		index = 0
+		for lines in _paragraphs(text):
+			data = []
+			paragraphs = [lines] if concatLines else [[line] for line in lines]
+			for parLines in paragraphs:
+				index += 1
+				with self.__lock:
+					self.__apply_settings(options, rules)
+					parText, lineSet = \
+						self.__text.createParagraphWithLines(parLines)
+					parJson = self.__checker.generateParagraphAsJSON(
+						index, parText, bEmptyIfNoErrors = "-owe" in params,
+						lLineSet = lineSet, bContext = "-ctx" in params)
+				if parJson:
+					data.append(json.loads(parJson))
+			yield lines[-1][0], data
+
+def _paragraphs(text):
+	"""
+		Split the text in paragraphs.
+
+		A paragraph is made of consecutive non blank lines. Blank lines are
+		only made of the same characters as for the plugin, so that both split
+		the text in the same paragraphs.
+
+		:param text: the text to split.
+		:type text: str
+		:return: a generator giving, for each paragraph, the list of its lines
+			as tuples containing line number (starting at 1) and line content.
+		:rtype: generator
+	"""
+	lines = []
+	for lineNumber, line in enumerate(text.split("\n"), 1):
+		if line.strip(_BLANK_CHARACTERS):
+			lines.append((lineNumber, line))
+		elif len(lines) > 0:
+			yield lines
+			lines = []
+	if len(lines) > 0:
+		yield lines
+
+class _Messages:
+	"""
+		The messages received on standard input.
+
+		Messages are read by a separate thread, so that cancel messages can be
+		received while a request is being analyzed.
+	"""
+
+	def __init__(self, source):
+		"""
+			Start reading the messages.
+
+			:param source: the stream to read.
+			:type source: io.TextIOBase
+		"""
+		self.__received = queue.Queue()
+		self.__pending = collections.deque()
+		reader = threading.Thread(target = self.__read, args = (source,))
+		reader.daemon = True
+		reader.start()
+
+	def __read(self, source):
+		""" Read the messages until the stream is closed """
+		for line in source:
+			self.__received.put(json.loads(line))
+		self.__received.put(None)
+
+	def next_request(self):
+		"""
+			Wait for the next request.
+
+			:return: the request, or None if the stream is closed.
+			:rtype: dict
+		"""
+		while True:
+			if len(self.__pending) > 0:
+				message = self.__pending.popleft()
+			else:
+				message = self.__received.get()
+			if message is None or "cancel" not in message:
+				return message
+
+	def is_cancelled(self, requestId):
+		"""
+			Indicate if the request was cancelled.
+
+			:param requestId: the identifier of the request.
+			:type requestId: int
+			:return: True if a cancel message was received for the request.
+			:rtype: bool
+		"""
+		cancelled = False
+		while True:
+			try:
+				message = self.__received.get_nowait()
+			except queue.Empty:
+				return cancelled
+			if message is not None and "cancel" in message:
+				cancelled = cancelled or message["cancel"] == requestId
+			else:
+				self.__pending.append(message)
+
+def serve(engine, source, target):
+	"""
+		Answer the requests until the source is closed.
+
+		:param engine: the Grammalecte engine.
+		:param source: the stream to read the requests from.
+		:param target: the stream to write the answers to.
+		:type engine: _Engine
+		:type source: io.TextIOBase
+		:type target: io.TextIOBase
+	"""
+	_write(target, {"ready": True})
+	target.flush()
+	messages = _Messages(source)
+	while True:
+		request = messages.next_request()
+		if request is None:
+			break
+		lastFlush = 0
+		try:
+			answer = {"id": request["id"], "end": True}
+			for lastLine, data in engine.analyze(request["text"],
+				request["options"], request["rules"], request["params"]):
+				_write(target, {"id": request["id"], "line": lastLine,
+					"data": data})
+				if time.time() - lastFlush >= _FLUSH_DELAY:
+					target.flush()
+					lastFlush = time.time()
+				if messages.is_cancelled(request["id"]):
+					answer = {"id": request["id"], "cancelled": True}
+					break
+			_write(target, answer)
+		except Exception:
+			_write(target, {"id": request["id"],
+				"error": traceback.format_exc()})
+		target.flush()
+
+def _write(target, answer):
+	""" Write an answer line """
+	target.write(json.dumps(answer, ensure_ascii = False) + "\n")
+
+def _listen(socketPath):
+	"""
+		Create the daemon socket.
+
+		:param socketPath: the path of the socket.
+		:type socketPath: str
+		:return: the listening socket, or None if another daemon is running.
+		:rtype: socket.socket
+	"""
+	if os.path.exists(socketPath):
+		probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		try:
+			probe.connect(socketPath)
+			probe.close()
+			return None
+		except socket.error:
+			probe.close()
+			os.unlink(socketPath)
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	try:
+		server.bind(socketPath)
+	except socket.error:
+		server.close()
+		return None
+	os.chmod(socketPath, 0o600)
+	server.listen(16)
+	return server
+
+def _serve_client(engine, connection):
+	""" Serve a daemon client until it disconnects """
+	try:
+		serve(engine, connection.makefile("r", encoding = "utf-8"),
+			connection.makefile("w", encoding = "utf-8"))
+	except (socket.error, ValueError):
+		pass
+	finally:
+		connection.close()
+
+def daemon(gramCli, socketPath):
+	"""
+		Run the worker as a daemon, listening on a Unix socket.
+
+		The socket is created before loading the engine, so that clients can
+		connect as soon as possible.
+
+		:param gramCli: the path to the Grammalecte command line interface.
+		:param socketPath: the path of the socket.
+		:type gramCli: str
+		:type socketPath: str
+	"""
+	server = _listen(socketPath)
+	if server is None:
+		return
+	try:
+		engine = _Engine(gramCli)
+		clients = []
+		server.settimeout(_DAEMON_IDLE_DELAY)
+		while True:
+			try:
+				connection, address = server.accept()
+			except socket.timeout:
+				clients = [c for c in clients if c.is_alive()]
+				if len(clients) == 0:
+					break
+				continue
+			connection.settimeout(None)
+			client = threading.Thread(
+				target = _serve_client, args = (engine, connection))
+			client.daemon = True
+			client.start()
+			clients.append(client)
+	finally:
+		os.unlink(socketPath)
+		server.close()
+
+def main(gramCli):
+	""" Run the worker until standard input is closed """
+	serve(_Engine(gramCli),
+		io.TextIOWrapper(sys.stdin.buffer, encoding = "utf-8"),
+		io.TextIOWrapper(sys.stdout.buffer, encoding = "utf-8"))
+
+if __name__ == "__main__":
+	if len(sys.argv) > 3 and sys.argv[2] == "--daemon":
+		daemon(sys.argv[1], sys.argv[3])
+	else:
+		main(sys.argv[1])
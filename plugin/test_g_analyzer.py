@@ -33,6 +33,9 @@
 
 import gobject
 import os
+import shutil
+import sys
+import tempfile
 import unittest
 
 from g_config import GrammalecteConfig
@@ -61,6 +64,10 @@ class MockRequester(GrammalecteRequester):
 		""" Get the configuration for the requester """
 		return self.config
 
+	def get_generation(self):
+		""" Get the generation of the requester content """
+		return 0
+
 	def on_result(self, analyzer, requester, result):
 		""" Set the result of the request """
 		if requester is not self:
@@ -77,8 +84,26 @@ class MockRequester(GrammalecteRequester):
 				self.spelling_errors += 1
 		self.result_action()
 
+# Stub of the command line interface, which only reads regular files
+STUB_CLI = """
+import json, os, sys
+path = sys.argv[sys.argv.index("-f") + 1]
+if not os.path.isfile(path):
+	print("# Error: file not found.")
+	sys.exit(1)
+with open(path) as textFile:
+	word = textFile.read().split()[0]
+print(json.dumps({"data": [{"iParagraph": 1, "lGrammarErrors": [],
+	"lSpellingErrors": [{"nStartY": 1, "nStartX": 0, "nEndY": 1,
+	"nEndX": len(word), "sValue": word}]}]}))
+"""
+
 class TestGrammalecteAnalyzer(unittest.TestCase):
 	def setUp(self):
+		# Do not use the disk cache of the user, for the user level
+		# configuration (level 1) is never saved by the tests
+		GrammalecteConfig().set_value(
+			GrammalecteConfig.DISK_CACHE_ACTIVE, False, 1)
 		self.mainloop = gobject.MainLoop()
 		self.analyzer = GrammalecteAnalyzer()
 		self.requester = MockRequester(
@@ -97,6 +122,25 @@ class TestGrammalecteAnalyzer(unittest.TestCase):
 		else:
 			print "WARNING: Grammalecte not found, tests skipped"
 
+	def test_analyze_with_cli(self):
+		directory = tempfile.mkdtemp()
+		try:
+			gramCli = os.path.join(directory, "cli.py")
+			with open(gramCli, "w") as cliFile:
+				cliFile.write(STUB_CLI)
+			self.requester.config.set_value(
+				GrammalecteConfig.GRAMMALECTE_PYTHON_EXE, sys.executable)
+			self.requester.config.set_value(
+				GrammalecteConfig.GRAMMALECTE_CLI, gramCli)
+			self.requester.config.set_value(
+				GrammalecteConfig.GRAMMALECTE_WORKER_ACTIVE, False)
+			self.analyzer.add_request(self.requester)
+			self.mainloop.run()
+			self.assertEqual(self.requester.grammar_errors, 0)
+			self.assertEqual(self.requester.spelling_errors, 1)
+		finally:
+			shutil.rmtree(directory)
+
 if __name__ == '__main__':
 	unittest.main()
 
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of pluma-grammalecte.
+#
+# pluma-grammalecte is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# pluma-grammalecte is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# pluma-grammalecte. If not, see <http://www.gnu.org/licenses/>.
+#
+# Ce fichier fait partie de pluma-grammalecte.
+#
+# pluma-grammalecte est un logiciel libre ; vous pouvez le redistribuer ou le
+# modifier suivant les termes de la GNU General Public License telle que
+# publiée par la Free Software Foundation ; soit la version 3 de la licence,
+# soit (à votre gré) toute version ultérieure.
+#
+# pluma-grammalecte est distribué dans l'espoir qu'il sera utile, mais SANS
+# AUCUNE GARANTIE ; sans même la garantie tacite de QUALITÉ MARCHANDE ou
+# d'ADÉQUATION à UN BUT PARTICULIER. Consultez la GNU General Public License
+# pour plus de détails.
+#
+# Vous devez avoir reçu une copie de la GNU General Public License en même
+# temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
+# <http://www.gnu.org/licenses>.
+
+
+import doctest
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import g_cache
+from g_cache import GResultCache, GDiskCache
+
+def load_tests(loader, tests, ignore):
+	tests.addTests(doctest.DocTestSuite(g_cache))
+	return tests
+
+class TestGResultCache(unittest.TestCase):
+	def setUp(self):
+		self.cache = GResultCache(3, 1024)
+
+	def buildResult(self, errorCount):
+		return {"lGrammarErrors": [{}] * errorCount, "lSpellingErrors": []}
+
+	def test_get_missing(self):
+		self.assertIsNone(self.cache.get("missing"))
+
+	def test_entries_bound(self):
+		for key in ["a", "b", "c", "d"]:
+			self.cache.put(key, self.buildResult(0))
+		self.assertEqual(len(self.cache), 3)
+		self.assertIsNone(self.cache.get("a"))
+
+	def test_lru_order(self):
+		for key in ["a", "b", "c"]:
+			self.cache.put(key, self.buildResult(0))
+		self.cache.get("a")
+		self.cache.put("d", self.buildResult(0))
+		self.assertIsNotNone(self.cache.get("a"))
+		self.assertIsNone(self.cache.get("b"))
+
+	def test_size_bound(self):
+		self.cache.put("a", self.buildResult(1))
+		self.cache.put("b", self.buildResult(1))
+		self.cache.put("c", self.buildResult(2))
+		self.assertLessEqual(self.cache.get_size(), 1024)
+		self.assertIsNone(self.cache.get("a"))
+		self.assertIsNotNone(self.cache.get("c"))
+
+	def test_replace(self):
+		self.cache.put("a", self.buildResult(2))
+		self.cache.put("a", self.buildResult(0))
+		self.assertEqual(len(self.cache), 1)
+		self.assertEqual(self.cache.get("a"), self.buildResult(0))
+
+	def test_oversized(self):
+		self.cache.put("a", self.buildResult(10))
+		self.assertEqual(len(self.cache), 1)
+
+class TestGDiskCache(unittest.TestCase):
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.filename = os.path.join(self.directory, "sub", "cache.sqlite")
+		self.cache = GDiskCache(self.filename, 4096)
+
+	def tearDown(self):
+		self.cache.close()
+		shutil.rmtree(self.directory)
+
+	def buildResult(self, errorCount):
+		return {"lGrammarErrors": [{"nStartY": 1}] * errorCount,
+			"lSpellingErrors": []}
+
+	def test_persistence(self):
+		self.cache.put_all({"a": self.buildResult(1)})
+		self.cache.close()
+		other = GDiskCache(self.filename, 4096)
+		self.assertEqual(other.get_all(["a"]), {"a": self.buildResult(1)})
+		other.close()
+
+	def test_shared(self):
+		other = GDiskCache(self.filename, 4096)
+		other.put_all({"a": self.buildResult(2)})
+		self.assertEqual(self.cache.get_all(["a"]), {"a": self.buildResult(2)})
+		other.close()
+
+	def test_missing(self):
+		self.assertEqual(self.cache.get_all(["missing"]), {})
+
+	def test_many_keys(self):
+		results = dict([(str(i), self.buildResult(0)) for i in range(1200)])
+		cache = GDiskCache(self.filename, 1024 * 1024)
+		cache.put_all(results)
+		self.assertEqual(len(cache.get_all(results.keys())), 1200)
+		cache.close()
+
+	def test_size(self):
+		self.cache.put_all({"a": self.buildResult(1)})
+		size = self.cache.get_size()
+		self.assertGreater(size, 0)
+		self.cache.put_all({"a": self.buildResult(1)})
+		self.assertEqual(self.cache.get_size(), size)
+		other = GDiskCache(self.filename, 4096)
+		other.put_all({"b": self.buildResult(1)})
+		self.assertEqual(self.cache.get_size(), 2 * size)
+		other.close()
+
+	def test_locked(self):
+		self.cache.put_all({"a": self.buildResult(1)})
+		locker = sqlite3.connect(self.filename, isolation_level = None)
+		locker.execute("BEGIN EXCLUSIVE")
+		self.cache.put_all({"b": self.buildResult(1)})
+		self.assertEqual(self.cache.get_all(["a"]), {})
+		locker.execute("ROLLBACK")
+		locker.close()
+		self.cache.put_all({"b": self.buildResult(1)})
+		self.assertEqual(len(self.cache.get_all(["a", "b"])), 2)
+
+	def test_eviction(self):
+		self.cache.put_all({"old": self.buildResult(200)})
+		self.cache.put_all({"new": self.buildResult(200)})
+		self.assertEqual(self.cache.get_all(["old"]), {})
+		self.assertEqual(len(self.cache.get_all(["new"])), 1)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of pluma-grammalecte.
+#
+# pluma-grammalecte is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# pluma-grammalecte is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# pluma-grammalecte. If not, see <http://www.gnu.org/licenses/>.
+#
+# Ce fichier fait partie de pluma-grammalecte.
+#
+# pluma-grammalecte est un logiciel libre ; vous pouvez le redistribuer ou le
+# modifier suivant les termes de la GNU General Public License telle que
+# publiée par la Free Software Foundation ; soit la version 3 de la licence,
+# soit (à votre gré) toute version ultérieure.
+#
+# pluma-grammalecte est distribué dans l'espoir qu'il sera utile, mais SANS
+# AUCUNE GARANTIE ; sans même la garantie tacite de QUALITÉ MARCHANDE ou
+# d'ADÉQUATION à UN BUT PARTICULIER. Consultez la GNU General Public License
+# pour plus de détails.
+#
+# Vous devez avoir reçu une copie de la GNU General Public License en même
+# temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
+# <http://www.gnu.org/licenses>.
+
+
+import unittest
+
+from g_converter import GErrorConverter
+from g_error import GErrorDesc
+
+class MockConfig:
+	""" Mock for the configuration """
+	def __init__(self, ignored):
+		self.ignored = [list(context) for context in ignored]
+
+	def get_value(self, xPath):
+		return True
+
+	def get_all_values(self, xPath):
+		return list(self.ignored)
+
+	def del_value(self, xPath, value):
+		self.ignored.remove(value)
+
+class TestGErrorConverter(unittest.TestCase):
+	def setUp(self):
+		self.config = MockConfig([("Un ", "mot", "."), ("Le ", "chien", "")])
+		self.result = [{"lGrammarErrors": [{"nStartY": 1, "nStartX": 3,
+			"nEndY": 1, "nEndX": 6, "sBefore": "Un ", "sUnderlined": "mot",
+			"sAfter": ".", "sMessage": "Erreur.", "aSuggestions": [],
+			"sType": "gn", "sRuleId": "r1"}], "lSpellingErrors": [
+			{"nStartY": 2, "nStartX": 0, "nEndY": 2, "nEndX": 4,
+			"sValue": "motz"}]}]
+
+	def test_convert(self):
+		store = GErrorConverter(self.config).convert(self.result)
+		errors = store.search_range((0, 0), (2, 0))
+		self.assertEqual([e[GErrorDesc.CONTEXT][1] for e in errors],
+			["motz"])
+
+	def test_purge(self):
+		GErrorConverter(self.config).convert(self.result)
+		self.assertEqual(self.config.ignored, [["Un ", "mot", "."]])
+
+	def test_no_purge(self):
+		GErrorConverter(self.config).convert(self.result, False)
+		self.assertEqual(len(self.config.ignored), 2)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -35,44 +35,39 @@ import doctest
 import unittest
 
 import g_error
-from g_error import AvlTree, GErrorDesc, GErrorStore
+from g_error import GError, GErrorDesc, GErrorStore
 
 def load_tests(loader, tests, ignore):
 	tests.addTests(doctest.DocTestSuite(g_error))
 	return tests
 
-class TestAvlTree(unittest.TestCase):
-	def setUp(self):
-		self.tree = AvlTree(self.compare, 51)
-		self.tree.add(-12)
-		self.tree.add(25)
-		self.tree.add(69)
-		self.tree.add(-2)
-		self.tree.add(2)
-
-	def compare(self, left, right):
-		return left - right
-
-	def test_order(self):
-		prev = -127
-		for element in self.tree:
-			self.assertGreaterEqual(element, prev)
-			prev = element
-
-	def test_len(self):
-		self.assertEqual(len(self.tree), 6)
+class TestGError(unittest.TestCase):
+	def buildError(self, description):
+		return GError((1, 1), (1, 5), ("", "word", ""), description, None,
+			[], "(option)", None)
+
+	def test_access(self):
+		error = self.buildError("(description)")
+		self.assertEqual(error[GErrorDesc.END], (1, 5))
+		self.assertEqual(error[GErrorDesc.CONTEXT][1], "word")
+		self.assertEqual(error[GErrorDesc.URL], None)
+		self.assertRaises(KeyError, lambda: error["unknown"])
+
+	def test_shared(self):
+		first = self.buildError("".join(["(descr", "iption)"]))
+		second = self.buildError("".join(["(desc", "ription)"]))
+		self.assertIs(first[GErrorDesc.DESCRIPTION],
+			second[GErrorDesc.DESCRIPTION])
+		self.assertIs(first[GErrorDesc.OPTION], second[GErrorDesc.OPTION])
 
 class TestGErrorStore(unittest.TestCase):
 	def setUp(self):
-		self.store = GErrorStore()
 		self.begin = self.buildError((1, 1), (1, 5))
 		self.multi = self.buildError((2, 51), (4, 2))
 		self.before = self.buildError((8, 4), (8, 15))
 		self.after = self.buildError((8, 17), (8, 65))
-		self.store.add(self.multi)
-		self.store.add(self.begin)
-		self.store.add(self.after)
-		self.store.add(self.before)
+		self.store = GErrorStore(
+			[self.multi, self.begin, self.after, self.before])
 
 	def buildError(self, start, end):
 		return {
@@ -95,6 +90,10 @@ class TestGErrorStore(unittest.TestCase):
 	def test_len(self):
 		self.assertEqual(len(self.store), 4)
 
+	def test_empty(self):
+		self.assertEqual(len(GErrorStore()), 0)
+		self.assertEqual(GErrorStore().search((1, 1)), None)
+
 	def test_search_begin(self):
 		self.assertEqual(self.store.search((1, 1)), self.begin)
 		self.assertEqual(self.store.search((1, 3)), self.begin)
@@ -124,6 +123,104 @@ class TestGErrorStore(unittest.TestCase):
 	def test_search_between(self):
 		self.assertEqual(self.store.search((8, 16)), None)
 
+	def test_search_outside(self):
+		self.assertEqual(self.store.search((0, 12)), None)
+		self.assertEqual(self.store.search((9, 0)), None)
+
+	def test_search_all_overlap(self):
+		inner = self.buildError((3, 4), (3, 9))
+		store = GErrorStore(
+			[self.multi, self.begin, inner, self.after, self.before])
+		self.assertEqual(store.search_all((3, 5)), [self.multi, inner])
+		self.assertEqual(store.search_all((3, 2)), [self.multi])
+		self.assertEqual(store.search_all((8, 16)), [])
+
+	def test_search_range(self):
+		self.assertEqual(self.store.search_range((1, 3), (2, 51)),
+			[self.begin, self.multi])
+		self.assertEqual(self.store.search_range((4, 3), (8, 3)), [])
+		self.assertEqual(self.store.search_range((0, 0), (100, 0)),
+			list(self.store))
+
+	def test_search_range_dense(self):
+		errors = [self.buildError((line, 0), (line + 3, 0))
+			for line in range(100)]
+		store = GErrorStore(errors)
+		self.assertEqual(store.search_all((50, 0)), errors[47:51])
+		self.assertEqual(store.search_range((10, 1), (20, 0)), errors[8:21])
+
+	def test_get_range(self):
+		self.assertEqual(self.store.get_range(3, 3), [self.multi])
+		self.assertEqual(self.store.get_range(4, 8),
+			[self.multi, self.before, self.after])
+		self.assertEqual(self.store.get_range(5, 7), [])
+
+	def test_next_error(self):
+		self.assertEqual(self.store.next_error((0, 0)), self.begin)
+		self.assertEqual(self.store.next_error((1, 1)), self.multi)
+		self.assertEqual(self.store.next_error((3, 0)), self.before)
+		self.assertEqual(self.store.next_error((8, 17)), None)
+
+	def test_previous_error(self):
+		self.assertEqual(self.store.previous_error((1, 1)), None)
+		self.assertEqual(self.store.previous_error((2, 51)), self.begin)
+		self.assertEqual(self.store.previous_error((8, 16)), self.before)
+		self.assertEqual(self.store.previous_error((100, 0)), self.after)
+
+	def test_edit_insert(self):
+		self.store.edit((8, 16), (8, 16), (8, 20))
+		self.assertEqual(self.store.get_limits(self.before), ((8, 4), (8, 15)))
+		self.assertEqual(self.store.get_limits(self.after), ((8, 21), (8, 69)))
+		self.assertEqual(self.store.search((8, 18)), None)
+		self.assertEqual(self.store.search((8, 21)), self.after)
+
+	def test_edit_insert_at_limits(self):
+		self.store.edit((8, 15), (8, 15), (8, 16))
+		self.store.edit((8, 18), (8, 18), (8, 19))
+		self.assertEqual(self.store.get_limits(self.before), ((8, 4), (8, 15)))
+		self.assertEqual(self.store.get_limits(self.after), ((8, 19), (8, 67)))
+
+	def test_edit_new_lines(self):
+		self.store.edit((3, 0), (3, 0), (5, 0))
+		self.assertEqual(self.store.get_limits(self.multi), ((2, 51), (6, 2)))
+		self.assertEqual(self.store.get_limits(self.after),
+			((10, 17), (10, 65)))
+		self.assertEqual(self.store.search((5, 8)), self.multi)
+		self.assertEqual(self.store.get_range(10, 10),
+			[self.before, self.after])
+		self.assertEqual(self.store.next_error((6, 0)), self.before)
+
+	def test_edit_delete(self):
+		self.store.edit((1, 3), (8, 10), (1, 3))
+		self.assertEqual(self.store.get_limits(self.begin), ((1, 1), (1, 3)))
+		self.assertEqual(self.store.get_limits(self.multi), ((1, 3), (1, 3)))
+		self.assertEqual(self.store.get_limits(self.before), ((1, 3), (1, 8)))
+		self.assertEqual(self.store.get_limits(self.after), ((1, 10), (1, 58)))
+		self.assertEqual(self.store.search((1, 12)), self.after)
+		self.assertEqual(self.store.previous_error((1, 10)), self.before)
+
+	def test_edit_delete_before(self):
+		self.store.edit((8, 16), (8, 17), (8, 16))
+		self.assertEqual(self.store.get_limits(self.after), ((8, 16), (8, 64)))
+		self.assertEqual(self.store.search_all((8, 16)), [self.after])
+		self.assertEqual(self.store.get_range(8, 8), [self.before, self.after])
+
+	def test_edit_delete_next(self):
+		self.store.edit((8, 16), (8, 17), (8, 16))
+		self.assertEqual(self.store.next_error((8, 16)), None)
+		self.assertEqual(self.store.next_error((8, 15)), self.after)
+		self.assertEqual(self.store.previous_error((8, 16)), self.before)
+
+	def test_edit_typing(self):
+		for offset in range(20, 30):
+			self.store.edit((8, offset), (8, offset), (8, offset + 1))
+		for offset in range(29, 25, -1):
+			self.store.edit((8, offset), (8, offset + 1), (8, offset))
+		self.store.edit((8, 4), (8, 5), (8, 4))
+		self.store.edit((8, 3), (8, 4), (8, 3))
+		self.assertEqual(self.store.get_limits(self.after), ((8, 15), (8, 69)))
+		self.assertEqual(self.store.get_limits(self.before), ((8, 3), (8, 13)))
+
 if __name__ == '__main__':
 	unittest.main()
 
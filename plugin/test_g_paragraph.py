@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of pluma-grammalecte.
+#
+# pluma-grammalecte is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# pluma-grammalecte is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# pluma-grammalecte. If not, see <http://www.gnu.org/licenses/>.
+#
+# Ce fichier fait partie de pluma-grammalecte.
+#
+# pluma-grammalecte est un logiciel libre ; vous pouvez le redistribuer ou le
+# modifier suivant les termes de la GNU General Public License telle que
+# publiée par la Free Software Foundation ; soit la version 3 de la licence,
+# soit (à votre gré) toute version ultérieure.
+#
+# pluma-grammalecte est distribué dans l'espoir qu'il sera utile, mais SANS
+# AUCUNE GARANTIE ; sans même la garantie tacite de QUALITÉ MARCHANDE ou
+# d'ADÉQUATION à UN BUT PARTICULIER. Consultez la GNU General Public License
+# pour plus de détails.
+#
+# Vous devez avoir reçu une copie de la GNU General Public License en même
+# temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
+# <http://www.gnu.org/licenses>.
+
+
+import doctest
+import random
+import unittest
+
+import g_paragraph
+from g_paragraph import split_paragraphs, compose_paragraphs, dispatch_result
+from g_paragraph import shift_result, is_empty_result, sort_paragraphs
+from g_paragraph import split_shards, get_line_starts, get_offset
+from g_paragraph import update_paragraphs, GDirtyLines
+
+def load_tests(loader, tests, ignore):
+	tests.addTests(doctest.DocTestSuite(g_paragraph))
+	return tests
+
+class TestParagraphs(unittest.TestCase):
+	def setUp(self):
+		self.text = "\n" \
+			"Premier paragraphe\n" \
+			"sur deux lignes.\n" \
+			"   \n" \
+			"Second paragraphe.\n" \
+			"\n" \
+			"\n" \
+			"Premier paragraphe\n" \
+			"sur deux lignes.\n"
+		self.paragraphs = split_paragraphs(self.text)
+
+	def buildError(self, startLine, endLine):
+		return {"nStartY": startLine, "nStartX": 0, "nEndY": endLine,
+			"nEndX": 1}
+
+	def test_split(self):
+		self.assertEqual([p.firstLine for p in self.paragraphs], [1, 4, 7])
+		self.assertEqual([p.lineCount for p in self.paragraphs], [2, 1, 2])
+
+	def test_split_blank(self):
+		paragraphs = split_paragraphs("a\n\xc2\xa0\n\x0c\nb\n \t\r\nc")
+		self.assertEqual([p.lineCount for p in paragraphs], [4, 1])
+
+	def test_key(self):
+		self.assertEqual(self.paragraphs[0].key, self.paragraphs[2].key)
+		self.assertNotEqual(self.paragraphs[0].key, self.paragraphs[1].key)
+
+	def test_sort(self):
+		paragraphs = sort_paragraphs(self.paragraphs, 4, (6, 100))
+		self.assertEqual([p.firstLine for p in paragraphs],
+			[p.firstLine for p in self.paragraphs[1:]] +
+			[self.paragraphs[0].firstLine])
+		paragraphs = sort_paragraphs(self.paragraphs, None, None)
+		self.assertEqual([p.key for p in paragraphs],
+			[p.key for p in self.paragraphs])
+
+	def test_shards(self):
+		paragraphs = split_paragraphs("\n\n".join(["x" * 10] * 12))
+		shards = split_shards(paragraphs, 4)
+		self.assertEqual([len(s) for s in shards], [3, 3, 3, 3])
+		self.assertEqual(sum(shards, []), paragraphs)
+		self.assertEqual(len(split_shards(paragraphs[:2], 4)), 2)
+		self.assertEqual(split_shards([], 4), [])
+		self.assertEqual(split_shards(paragraphs, 1), [paragraphs])
+
+	def test_dispatch(self):
+		text, starts = compose_paragraphs(self.paragraphs[:2])
+		self.assertEqual(starts, [0, 3])
+		results = dispatch_result([
+			{"lGrammarErrors": [self.buildError(1, 2)],
+			"lSpellingErrors": [self.buildError(2, 2)]},
+			{"lGrammarErrors": [self.buildError(4, 4)],
+			"lSpellingErrors": []}], starts)
+		self.assertEqual(len(results), 2)
+		self.assertEqual(results[0]["lGrammarErrors"][0]["nEndY"], 2)
+		self.assertEqual(results[0]["lSpellingErrors"][0]["nStartY"], 2)
+		self.assertEqual(results[1]["lGrammarErrors"][0]["nStartY"], 1)
+		self.assertTrue(is_empty_result(dispatch_result([], starts)[1]))
+
+	def test_dispatch_last(self):
+		text, starts = compose_paragraphs(self.paragraphs[:2])
+		results = dispatch_result([
+			{"lGrammarErrors": [self.buildError(1, 2)],
+			"lSpellingErrors": []},
+			{"lGrammarErrors": [self.buildError(4, 4)],
+			"lSpellingErrors": []}], starts[1:])
+		self.assertEqual(len(results), 1)
+		self.assertEqual(len(results[0]["lGrammarErrors"]), 1)
+		self.assertEqual(results[0]["lGrammarErrors"][0]["nStartY"], 1)
+
+	def test_shift(self):
+		result = {"lGrammarErrors": [self.buildError(1, 2)],
+			"lSpellingErrors": []}
+		shifted = shift_result(result, self.paragraphs[2].firstLine)
+		self.assertEqual(shifted["lGrammarErrors"][0]["nStartY"], 8)
+		self.assertEqual(shifted["lGrammarErrors"][0]["nEndY"], 9)
+		self.assertEqual(result["lGrammarErrors"][0]["nStartY"], 1)
+
+	def test_update(self):
+		generator = random.Random(4)
+		lines = self.text.split("\n")
+		for attempt in range(50):
+			paragraphs = split_paragraphs("\n".join(lines))
+			dirty = GDirtyLines()
+			for edit in range(generator.randint(1, 4)):
+				start = generator.randint(0, len(lines) - 1)
+				oldEnd = min(generator.randint(start, start + 2),
+					len(lines) - 1)
+				newLines = [generator.choice(["", " ", "x", "y z"])
+					for line in range(generator.randint(1, 3))]
+				newLines[0] = lines[start][:1] + newLines[0]
+				lines[start:oldEnd + 1] = newLines
+				dirty.edit(start, oldEnd, start + len(newLines) - 1)
+			text = "\n".join(lines)
+			expected = split_paragraphs(text)
+			updated = update_paragraphs(paragraphs, text, dirty.get_ranges())
+			self.assertEqual([(p.firstLine, p.key) for p in updated],
+				[(p.firstLine, p.key) for p in expected])
+
+	def test_offset(self):
+		starts = get_line_starts(self.text.decode("utf-8"))
+		self.assertEqual(len(starts), 11)
+		self.assertEqual(get_offset(starts, 1, 0), 1)
+		self.assertEqual(get_offset(starts, 2, 3), 23)
+		self.assertEqual(get_offset(starts, 3, 10), 40)
+		self.assertEqual(get_offset(starts, 20, 5), len(self.text))
+
+if __name__ == '__main__':
+	unittest.main()
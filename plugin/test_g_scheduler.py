@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of pluma-grammalecte.
+#
+# pluma-grammalecte is free software: you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or (at your
+# option) any later version.
+#
+# pluma-grammalecte is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or
+# FITNESS FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+# details.
+#
+# You should have received a copy of the GNU General Public License along with
+# pluma-grammalecte. If not, see <http://www.gnu.org/licenses/>.
+#
+# Ce fichier fait partie de pluma-grammalecte.
+#
+# pluma-grammalecte est un logiciel libre ; vous pouvez le redistribuer ou le
+# modifier suivant les termes de la GNU General Public License telle que
+# publiée par la Free Software Foundation ; soit la version 3 de la licence,
+# soit (à votre gré) toute version ultérieure.
+#
+# pluma-grammalecte est distribué dans l'espoir qu'il sera utile, mais SANS
+# AUCUNE GARANTIE ; sans même la garantie tacite de QUALITÉ MARCHANDE ou
+# d'ADÉQUATION à UN BUT PARTICULIER. Consultez la GNU General Public License
+# pour plus de détails.
+#
+# Vous devez avoir reçu une copie de la GNU General Public License en même
+# temps que pluma-grammalecte ; si ce n'est pas le cas, consultez
+# <http://www.gnu.org/licenses>.
+
+import doctest
+import unittest
+
+import g_scheduler
+from g_scheduler import GRequestQueue
+
+def load_tests(loader, tests, ignore):
+	tests.addTests(doctest.DocTestSuite(g_scheduler))
+	return tests
+
+class TestGRequestQueue(unittest.TestCase):
+	def setUp(self):
+		self.queue = GRequestQueue()
+
+	def test_empty(self):
+		self.assertTrue(self.queue.is_empty())
+		self.assertEqual(self.queue.get_queue_depth(), 0)
+		self.assertIsNone(self.queue.get())
+
+	def test_order(self):
+		for requester in ["a", "b", "c"]:
+			self.assertTrue(self.queue.put(requester))
+		self.assertEqual(
+			[self.queue.get() for i in range(3)], ["a", "b", "c"])
+		self.assertTrue(self.queue.is_empty())
+
+	def test_merge(self):
+		for i in range(10):
+			for requester in ["a", "b", "c"]:
+				self.queue.put(requester)
+		self.assertEqual(self.queue.get_queue_depth(), 3)
+		self.assertEqual(self.queue.get(), "a")
+		self.assertTrue(self.queue.put("a"))
+		self.assertEqual(
+			[self.queue.get() for i in range(3)], ["b", "c", "a"])
+
+	def test_priority(self):
+		priorities = {"a": 2, "b": 1, "c": 2, "d": 0}
+		queue = GRequestQueue(lambda requester: priorities[requester])
+		for requester in ["a", "b", "c", "d"]:
+			queue.put(requester)
+		self.assertEqual(queue.get(), "d")
+		priorities["c"] = 0
+		self.assertEqual(
+			[queue.get() for i in range(3)], ["c", "b", "a"])
+
+	def test_fairness(self):
+		queue = GRequestQueue(lambda requester: requester[1],
+			lambda requester: requester[0])
+		for requester in ["a1", "a1", "a1", "a2", "b1", "c0", "b1"]:
+			queue.put(requester + str(len(queue)))
+		self.assertEqual([queue.get() for i in range(7)],
+			["c05", "a10", "b14", "a11", "b16", "a12", "a23"])
+
+	def test_busy(self):
+		for requester in ["a", "b", "c"]:
+			self.queue.put(requester)
+		self.assertEqual(self.queue.get(set(["a", "b"])), "c")
+		self.assertIsNone(self.queue.get(set(["a", "b"])))
+		self.assertEqual(self.queue.get_queue_depth(), 2)
+		self.assertEqual(self.queue.get(set(["a"])), "b")
+
+	def test_remove(self):
+		self.queue.put("a")
+		self.queue.put("b")
+		self.queue.remove("a")
+		self.queue.remove("missing")
+		self.assertNotIn("a", self.queue)
+		self.assertIn("b", self.queue)
+		self.assertEqual(len(self.queue), 1)
+		self.queue.clear()
+		self.assertTrue(self.queue.is_empty())
+
+if __name__ == '__main__':
+	unittest.main()